@@ -9,8 +9,15 @@ admin.site.register(Course)
 admin.site.register(CourseMappings)
 admin.site.register(CourseMappingRelation)
 admin.site.register(Exam)
+admin.site.register(ExamSlot)
 admin.site.register(Hall)
 admin.site.register(Instructor)
 admin.site.register(AvailabilityDay)
 admin.site.register(AvailabilityTime)
-admin.site.register(InstructorOnHall)
\ No newline at end of file
+admin.site.register(InstructorOnHall)
+admin.site.register(ScheduleJob)
+admin.site.register(ExamSummary)
+admin.site.register(HallOccupancy)
+admin.site.register(UploadJob)
+admin.site.register(UploadLedger)
+admin.site.register(CacheVersion)
\ No newline at end of file
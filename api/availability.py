@@ -0,0 +1,37 @@
+"""Parsing of the "01Jan" / "9:00AM" availability strings sent by the UI."""
+from datetime import date, datetime
+
+from dateutil import parser
+
+
+def parse_day(text, reference=None):
+    """Date for a "01Jan"-style day: its first occurrence on or after ``reference``.
+
+    The UI only sends day and month and instructors give availability for
+    exams still to come, so the year is the first one, counting from
+    ``reference`` (today by default), in which that day has not yet passed.
+    Returns None if the text cannot be parsed.
+    """
+    try:
+        parsed = parser.parse(f"2024-{text[2:]}-{text[:2]}")
+    except (TypeError, ValueError, OverflowError):
+        return None
+    reference = reference or date.today()
+    if isinstance(reference, datetime):
+        reference = reference.date()
+    # 29 Feb may be up to eight years away
+    for year in range(reference.year, reference.year + 9):
+        try:
+            day = date(year, parsed.month, parsed.day)
+        except ValueError:
+            continue
+        if day >= reference:
+            return day
+
+
+def parse_time(text):
+    """Time for a "9:00AM"-style value, or None"""
+    try:
+        return parser.parse(text).time()
+    except (TypeError, ValueError, OverflowError):
+        return None
@@ -0,0 +1,92 @@
+"""Instructor availability and duties as bitsets over all instructors.
+
+Bit ``k`` of every mask stands for the ``k``-th instructor by ID. Each
+process builds the index lazily and rebuilds it when its version stamp in
+the database moves. Saves and deletes of instructors, availability rows
+and duties bump the stamp in the writing transaction. Bulk writes do not
+send signals, so code using them must call ``invalidate()`` inside their
+transaction.
+"""
+import threading
+
+from django.db.models.signals import post_delete, post_save
+
+from . import cache_versions
+from .models import AvailabilityDay, AvailabilityTime, Instructor, InstructorOnHall
+
+VERSION_KEY = 'availability-index-version'
+
+_lock = threading.Lock()
+_index = None
+
+
+class AvailabilityIndex:
+    """``free[(date, time)]`` masks the instructors available at that time
+    and ``duties[examID]`` those invigilating the exam"""
+
+    def __init__(self, instructors, availability, duties, version=None):
+        self.version = version
+        self.instructors = sorted(instructors)
+        self.position = {instructor[0]: k for k, instructor in enumerate(self.instructors)}
+        self.free = {}
+        for instructor_id, date, time in availability:
+            if instructor_id in self.position and date and time:
+                self.free[(date, time)] = self.free.get((date, time), 0) | self.bit(instructor_id)
+        self.duties = {}
+        for exam_id, instructor_id in duties:
+            self.duties[exam_id] = self.duties.get(exam_id, 0) | self.bit(instructor_id)
+
+    @classmethod
+    def from_db(cls, version=None):
+        return cls(
+            Instructor.objects.values_list('instructorID', 'name', 'email'),
+            AvailabilityTime.objects.values_list('availabilityId__instructorID', 'availabilityId__availableOn', 'availableAt'),
+            InstructorOnHall.objects.values_list('examID', 'instructorID').distinct(),
+            version,
+        )
+
+    def bit(self, instructor_id):
+        return 1 << self.position[instructor_id]
+
+    def available_for(self, date, time, exam_id, other_exam_ids):
+        """Instructors free at (date, time) and not invigilating another of
+        ``other_exam_ids``, unless they already invigilate ``exam_id``"""
+        busy = 0
+        for other in other_exam_ids:
+            busy |= self.duties.get(other, 0)
+        mask = self.free.get((date, time), 0) & ~(busy & ~self.duties.get(exam_id, 0))
+        return [self.instructors[k] for k in _bits(mask)]
+
+
+def _bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def current_version():
+    return cache_versions.current(VERSION_KEY)
+
+
+def invalidate():
+    """Make every process rebuild its index once the current transaction commits"""
+    return cache_versions.bump(VERSION_KEY)
+
+
+def get_index():
+    global _index
+    version = current_version()
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = AvailabilityIndex.from_db(version)
+        return _index
+
+
+def _changed(sender, **kwargs):
+    invalidate()
+
+
+for _model in (Instructor, AvailabilityDay, AvailabilityTime, InstructorOnHall):
+    post_save.connect(_changed, sender=_model, dispatch_uid=f'availability-index-save-{_model.__name__}')
+    post_delete.connect(_changed, sender=_model, dispatch_uid=f'availability-index-delete-{_model.__name__}')
@@ -0,0 +1,28 @@
+"""Version stamps for per-process caches, kept in the database.
+
+A process compares its cached copy's stamp with the row before using it.
+Writers bump the row in the same transaction as their change, so every
+process sees the new stamp exactly when it can see the new data.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import CacheVersion
+
+
+def current(name):
+    """Committed stamp of cache ``name``; 1 until it is first bumped"""
+    return CacheVersion.objects.filter(name=name).values_list('version', flat=True).first() or 1
+
+
+def bump(name):
+    """Advance the stamp of ``name`` in the current transaction and return it"""
+    with transaction.atomic():
+        if not CacheVersion.objects.filter(name=name).update(version=F('version') + 1):
+            try:
+                with transaction.atomic():
+                    CacheVersion.objects.create(name=name, version=2)
+            except IntegrityError:
+                # Another writer created the row first
+                CacheVersion.objects.filter(name=name).update(version=F('version') + 1)
+        return CacheVersion.objects.get(name=name).version
@@ -0,0 +1,145 @@
+"""Cached sparse course x course co-enrolment counts.
+
+Each process keeps one ``CoEnrolment`` built from a single Enrollment scan.
+A version stamp in the database tells processes when to rebuild: Enrollment
+signals bump it in the writing transaction and patch the local copy once
+that commits. Bulk writes do not send signals, so code using them must call
+``invalidate()`` inside their transaction.
+"""
+import threading
+from array import array
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache_versions
+from .models import Enrollment
+
+VERSION_KEY = 'coenrolment-version'
+
+_lock = threading.Lock()
+_matrix = None
+
+
+def load_enrolments():
+    """Load every enrolment once as parallel (student, course) integer arrays"""
+    students = array('q')
+    courses = array('q')
+    rows = Enrollment.objects.values_list('student_id', 'course_id').iterator(chunk_size=5000)
+    for student_id, course_id in rows:
+        students.append(student_id)
+        courses.append(course_id)
+    return students, courses
+
+
+class CoEnrolment:
+    """Dict-of-dicts co-enrolment matrix.
+
+    ``pairs[a][b]`` is the number of students taking both courses ``a`` and
+    ``b`` (absent when zero) and ``sizes[a]`` the number taking ``a``.
+    """
+
+    def __init__(self, students, courses, version=None):
+        self.version = version
+        self.courses_of = {}
+        self.sizes = {}
+        self.pairs = {}
+        for student_id, course_id in zip(students, courses):
+            self.add(student_id, course_id)
+
+    def shared(self, a, b):
+        """Students enrolled in both courses ``a`` and ``b``"""
+        if a == b:
+            return self.sizes.get(a, 0)
+        return self.pairs.get(a, {}).get(b, 0)
+
+    def neighbours(self, course_id):
+        """Courses sharing students with ``course_id`` and how many"""
+        return self.pairs.get(course_id, {})
+
+    def add(self, student_id, course_id):
+        taken = self.courses_of.setdefault(student_id, {})
+        if course_id in taken:
+            return
+        for other in taken:
+            self._bump(course_id, other, 1)
+        taken[course_id] = None
+        self.sizes[course_id] = self.sizes.get(course_id, 0) + 1
+
+    def remove(self, student_id, course_id):
+        taken = self.courses_of.get(student_id, {})
+        if course_id not in taken:
+            return
+        del taken[course_id]
+        for other in taken:
+            self._bump(course_id, other, -1)
+        self.sizes[course_id] -= 1
+
+    def _bump(self, a, b, delta):
+        for x, y in ((a, b), (b, a)):
+            row = self.pairs.setdefault(x, {})
+            count = row.get(y, 0) + delta
+            if count:
+                row[y] = count
+            else:
+                row.pop(y, None)
+
+    def enrolments(self):
+        """Every enrolment as parallel (student, course) arrays, grouped by student"""
+        students = array('q')
+        courses = array('q')
+        # A commit in another thread may patch the matrix while it is read
+        with _lock:
+            for student_id, taken in self.courses_of.items():
+                for course_id in taken:
+                    students.append(student_id)
+                    courses.append(course_id)
+        return students, courses
+
+
+def current_version():
+    return cache_versions.current(VERSION_KEY)
+
+
+def invalidate():
+    """Make every process rebuild its matrix once the current transaction commits"""
+    return cache_versions.bump(VERSION_KEY)
+
+
+def get_matrix():
+    """This process's matrix, rebuilt if another process changed enrolments"""
+    global _matrix
+    version = current_version()
+    with _lock:
+        if _matrix is None or _matrix.version != version:
+            students, courses = load_enrolments()
+            _matrix = CoEnrolment(students, courses, version)
+        return _matrix
+
+
+def _patch(method, student_id, course_id):
+    version = invalidate()
+
+    def apply():
+        # Patch only a matrix that is exactly one change behind
+        with _lock:
+            if _matrix is not None and _matrix.version == version - 1:
+                getattr(_matrix, method)(student_id, course_id)
+                _matrix.version = version
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Enrollment)
+def enrolment_saved(sender, instance, created, **kwargs):
+    if created:
+        _patch('add', instance.student_id, instance.course_id)
+    else:
+        # The previous course is unknown, so start over
+        invalidate()
+
+
+@receiver(post_delete, sender=Enrollment)
+def enrolment_deleted(sender, instance, **kwargs):
+    _patch('remove', instance.student_id, instance.course_id)
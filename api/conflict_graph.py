@@ -0,0 +1,104 @@
+"""In-memory exam conflict graph built from the cached enrolments."""
+from array import array
+from collections import defaultdict
+
+
+class ConflictGraph:
+    """Exam x exam co-enrolment graph.
+
+    Nodes are positions in ``exams``. ``adjacency[i]`` maps every exam that
+    shares at least one student with exam ``i`` to the number of shared
+    students, and ``students[i]`` holds the IDs of the students sitting it.
+    """
+
+    def __init__(self, exams, students, courses):
+        self.exams = list(exams)
+        self.index = {exam.examID: i for i, exam in enumerate(self.exams)}
+        self.colleges = [exam.college for exam in self.exams]
+
+        exams_by_course = defaultdict(list)
+        for i, exam in enumerate(self.exams):
+            exams_by_course[exam.courseID_id].append(i)
+
+        members = [array('q') for _ in self.exams]
+        student_exams = defaultdict(list)
+        for student_id, course_id in zip(students, courses):
+            for i in exams_by_course.get(course_id, ()):
+                members[i].append(student_id)
+                student_exams[student_id].append(i)
+
+        self.students = members
+        self.sizes = [len(m) for m in members]
+        self.adjacency = [{} for _ in self.exams]
+        for exam_ids in student_exams.values():
+            for a, i in enumerate(exam_ids):
+                row = self.adjacency[i]
+                for j in exam_ids[a + 1:]:
+                    row[j] = row.get(j, 0) + 1
+                    self.adjacency[j][i] = row[j]
+
+    def __getstate__(self):
+        # Pool workers only need the integer structure, not model instances
+        state = self.__dict__.copy()
+        state['exams'] = None
+        return state
+
+    @classmethod
+    def from_db(cls, exams):
+        # Imported here so pool workers can unpickle graphs without Django set up
+        from .coenrolment import get_matrix
+
+        students, courses = get_matrix().enrolments()
+        return cls(exams, students, courses)
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def weight(self, i, j):
+        """Number of students shared by exams ``i`` and ``j``"""
+        return self.adjacency[i].get(j, 0)
+
+    def degree(self, i):
+        return len(self.adjacency[i])
+
+    def conflicts_with(self, i, others):
+        """True if exam ``i`` shares a student with any exam in ``others``"""
+        neighbours = self.adjacency[i]
+        if len(others) < len(neighbours):
+            return any(j in neighbours for j in others)
+        return any(j in others for j in neighbours)
+
+    def components(self):
+        """Connected components as lists of exam positions, largest first"""
+        seen = [False] * len(self)
+        components = []
+        for start in range(len(self)):
+            if seen[start]:
+                continue
+            seen[start] = True
+            component = [start]
+            stack = [start]
+            while stack:
+                for j in self.adjacency[stack.pop()]:
+                    if not seen[j]:
+                        seen[j] = True
+                        component.append(j)
+                        stack.append(j)
+            components.append(component)
+        components.sort(key=len, reverse=True)
+        return components
+
+    def subgraph(self, indices):
+        """Graph induced by ``indices``; position ``k`` in it is ``indices[k]`` here"""
+        position = {i: k for k, i in enumerate(indices)}
+        sub = ConflictGraph.__new__(ConflictGraph)
+        sub.exams = [self.exams[i] for i in indices] if self.exams is not None else None
+        sub.index = {exam_id: position[i] for exam_id, i in self.index.items() if i in position}
+        sub.colleges = [self.colleges[i] for i in indices]
+        sub.students = [self.students[i] for i in indices]
+        sub.sizes = [self.sizes[i] for i in indices]
+        sub.adjacency = [
+            {position[j]: w for j, w in self.adjacency[i].items() if j in position}
+            for i in indices
+        ]
+        return sub
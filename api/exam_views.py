@@ -2,20 +2,34 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework import status
-from django.db.models import Count, Q
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
 from datetime import datetime, timedelta
 from dateutil import parser
 import pytz
 
 from .models import (
     Exam, Course, Student, Schedule, Hall, Instructor, InstructorOnHall,
-    CourseMappings, CourseMappingRelation, AvailabilityDay, AvailabilityTime
+    CourseMappings, CourseMappingRelation, AvailabilityDay, AvailabilityTime, ScheduleJob, ExamSlot,
+    HallOccupancy
 )
 from .serializers import ExamSerializer
+from . import jobs
+from .availability_index import invalidate as invalidate_availability
+from .conflict_graph import ConflictGraph
+from .hall_packing import pack_halls
+from .schedule_writer import chunked, write_schedule
+from .summaries import refresh_occupancy, refresh_summaries
+from .scheduler import (
+    ALGORITHMS, DEFAULT_TIMES, MAX_CALENDAR_DAYS, MAX_OPTIMISE_SECONDS, MAX_RESTARTS, Calendar, Timetable, evaluate,
+    multi_start, repair_schedule, solve_components
+)
 
 
 @api_view(['PUT'])
 @permission_classes([AllowAny])
+@transaction.atomic
 def exam_update(request, id):
     """Update exam date/time and handle related schedules"""
     try:
@@ -23,6 +37,8 @@ def exam_update(request, id):
     except Exam.DoesNotExist:
         return Response({'message': 'No exam found with the given ID.'}, status=status.HTTP_404_NOT_FOUND)
     
+    touched = [exam.examID]
+    slots = {exam.slot_id}
     date_str = request.data.get('date')
     time_str = request.data.get('time')
     college = request.GET.get('college')
@@ -51,9 +67,11 @@ def exam_update(request, id):
                 for related_course in related_courses:
                     try:
                         related_exam = Exam.objects.get(courseID=related_course)
+                        slots.add(related_exam.slot_id)
                         related_exam.date = formatted_date
                         related_exam.time = time_str
                         related_exam.save()
+                        touched.append(related_exam.examID)
                         
                         # Create schedules for related exam students
                         related_students = Student.objects.filter(courses=related_course)
@@ -96,16 +114,22 @@ def exam_update(request, id):
                 for related_course in related_courses:
                     try:
                         related_exam = Exam.objects.get(courseID=related_course)
+                        slots.add(related_exam.slot_id)
                         InstructorOnHall.objects.filter(examID=related_exam).delete()
                         Schedule.objects.filter(examID=related_exam).delete()
                         related_exam.date = None
                         related_exam.time = None
                         related_exam.save()
+                        touched.append(related_exam.examID)
                     except Exam.DoesNotExist:
                         continue
         except Course.DoesNotExist:
             pass
     
+    refresh_summaries(touched)
+    slots.update(Exam.objects.filter(examID__in=touched).values_list('slot', flat=True))
+    refresh_occupancy(slots)
+    
     return Response({'message': 'Exam and equivalent exams updated successfully.'})
 
 
@@ -114,7 +138,9 @@ def exam_update(request, id):
 def exam_delete(request, id):
     try:
         exam = Exam.objects.get(examID=id)
-        exam.delete()
+        with transaction.atomic():
+            exam.delete()
+            refresh_occupancy([exam.slot_id])
         return Response({'message': 'Exam deleted'})
     except Exam.DoesNotExist:
         return Response({'error': 'Exam not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -122,6 +148,7 @@ def exam_delete(request, id):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@transaction.atomic
 def exam_select_hall(request, examID):
     """Assign halls to exam"""
     try:
@@ -132,6 +159,12 @@ def exam_select_hall(request, examID):
     selected_halls = request.data.get('selectedHalls', [])
     student_count = Schedule.objects.filter(examID=exam).count()
     
+    # Seats taken in each hall this slot, less this exam's own students
+    occupied = dict(HallOccupancy.objects.filter(slot=exam.slot_id).values_list('hallID', 'seats'))
+    own = Schedule.objects.filter(examID=exam, hallID__isnull=False).values_list('hallID').annotate(seats=Count('scheduleID'))
+    for hall_id, seats in own:
+        occupied[hall_id] = occupied.get(hall_id, 0) - seats
+    
     for hall_data in selected_halls:
         hall_id = hall_data.get('hallID')
         try:
@@ -142,17 +175,11 @@ def exam_select_hall(request, examID):
         hall_capacity = hall.capacity
         
         # Check if hall is already used at the same time
-        existing_schedules = Schedule.objects.filter(
-            hallID=hall,
-            examID__date=exam.date,
-            examID__time=exam.time
-        ).exclude(examID=exam)
-        
-        hall_previously_used = existing_schedules.exists()
+        existing_count = occupied.get(hall.hallID, 0)
+        hall_previously_used = existing_count > 0
         
         if hall_previously_used:
             # Reduce capacity by existing usage
-            existing_count = existing_schedules.count()
             hall_capacity = max(0, hall_capacity - existing_count)
         
         if student_count <= 0:
@@ -175,8 +202,7 @@ def exam_select_hall(request, examID):
             if hall_previously_used:
                 existing_instructors = InstructorOnHall.objects.filter(
                     hallID=hall,
-                    examID__date=exam.date,
-                    examID__time=exam.time
+                    examID__slot=exam.slot_id
                 ).distinct()
                 
                 for inst_on_hall in existing_instructors:
@@ -188,116 +214,334 @@ def exam_select_hall(request, examID):
             
             student_count -= students_to_assign
     
+    refresh_summaries([exam.examID])
+    refresh_occupancy([exam.slot_id])
+    
     return Response({'message': 'تم توزيع القاعات بنجاح'})
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def slot_assign_halls(request, slotID):
+    """Assign halls to every exam sitting in a slot at once"""
+    try:
+        slot = ExamSlot.objects.get(slotID=slotID)
+    except ExamSlot.DoesNotExist:
+        return Response({'error': 'Exam slot not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    # Free seats come from the occupancy table, which every hall write keeps current
+    halls = Hall.objects.annotate(
+        occupied=Coalesce(Sum('occupancies__seats', filter=Q(occupancies__slot=slot)), 0)
+    )
+    hall_ids = request.data.get('hallIDs')
+    if hall_ids:
+        halls = halls.filter(hallID__in=hall_ids)
+    capacities = {hall.hallID: max(0, hall.capacity - hall.occupied) for hall in halls}
+    
+    # Students of the slot still waiting for a hall
+    demands = {}
+    waiting = {}
+    for schedule_id, exam_id in Schedule.objects.filter(examID__slot=slot, hallID__isnull=True).values_list(
+        'scheduleID', 'examID'
+    ):
+        demands[exam_id] = demands.get(exam_id, 0) + 1
+        waiting.setdefault(exam_id, []).append(schedule_id)
+    
+    assignments, unassigned = pack_halls(demands, capacities)
+    
+    updates = []
+    for exam_id, chosen in assignments.items():
+        schedule_ids = iter(waiting[exam_id])
+        for hall_id, students in chosen:
+            for _ in range(students):
+                updates.append(Schedule(scheduleID=next(schedule_ids), hallID_id=hall_id))
+    
+    # Halls shared with an exam that already has invigilators keep them
+    used_halls = {hall_id for chosen in assignments.values() for hall_id, _ in chosen}
+    invigilators = {}
+    for hall_id, instructor_id in InstructorOnHall.objects.filter(
+        examID__slot=slot, hallID__in=used_halls
+    ).values_list('hallID', 'instructorID').distinct():
+        invigilators.setdefault(hall_id, []).append(instructor_id)
+    copies = [
+        InstructorOnHall(examID_id=exam_id, hallID_id=hall_id, instructorID_id=instructor_id)
+        for exam_id, chosen in assignments.items()
+        for hall_id, _ in chosen
+        for instructor_id in invigilators.get(hall_id, ())
+    ]
+    
+    with transaction.atomic():
+        for rows in chunked(updates):
+            Schedule.objects.bulk_update(rows, ['hallID'])
+        InstructorOnHall.objects.bulk_create(copies, ignore_conflicts=True)
+        invalidate_availability()
+        refresh_summaries(assignments)
+        refresh_occupancy([slot.slotID])
+    
+    return Response({
+        'message': 'تم توزيع القاعات بنجاح',
+        'assignments': {
+            exam_id: [{'hallID': hall_id, 'students': students} for hall_id, students in chosen]
+            for exam_id, chosen in assignments.items()
+        },
+        'unassigned': unassigned,
+    })
+
+
+def _option(request, name, default=None):
+    """Scheduling option from the request body, falling back to the query string"""
+    value = request.data.get(name)
+    if value is None or value == '':
+        value = request.GET.get(name, default)
+    return value
+
+
+def _flag(request, name):
+    return str(_option(request, name, '')).lower() in ('1', 'true', 'yes')
+
+
+def _schedule_options(request):
+    """Validated scheduling options from a request; raises ValueError"""
+    algorithm = _option(request, 'algorithm', 'greedy')
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f'Unknown scheduling algorithm: {algorithm} (use one of: {", ".join(ALGORITHMS)})')
+    
+    try:
+        optimise_seconds = float(_option(request, 'optimise', 0))
+    except (TypeError, ValueError):
+        raise ValueError('optimise must be a number of seconds')
+    if not 0 <= optimise_seconds <= MAX_OPTIMISE_SECONDS:
+        raise ValueError(f'optimise must be between 0 and {MAX_OPTIMISE_SECONDS} seconds')
+    
+    try:
+        restarts = int(_option(request, 'restarts', 1))
+    except (TypeError, ValueError):
+        raise ValueError('restarts must be a whole number')
+    if not 1 <= restarts <= MAX_RESTARTS:
+        raise ValueError(f'restarts must be between 1 and {MAX_RESTARTS}')
+    
+    return {
+        'algorithm': algorithm,
+        'optimise': optimise_seconds,
+        'restarts': restarts,
+        'decompose': _flag(request, 'decompose'),
+        'dry_run': _flag(request, 'dry_run'),
+    }
+
+
+def _run_schedule(options, progress=None):
+    """Schedule every undated exam and save the result"""
+    def report(phase, percent, placed=None, total=None):
+        if progress is not None:
+            progress(phase, percent, placed, total)
+    
+    report('loading', 0)
+    exams = Exam.objects.filter(date__isnull=True).order_by('examID')
+    
+    # Load enrolments once and answer every conflict check from the graph
+    graph = ConflictGraph.from_db(exams)
+    report('scheduling', 10, 0, len(graph))
+    
+    # The configured slot calendar, or 14 working days with 2 sittings each
+    upcoming = ExamSlot.objects.filter(inCalendar=True, date__gt=datetime.now().date())
+    calendar = Calendar.from_slots(upcoming.values_list('date', 'time'))
+    if not len(calendar):
+        calendar = Calendar.working_days(datetime.now() + timedelta(days=1))
+    
+    # Each restart orders exams differently and may run the optional
+    # improvement phase; the lowest-penalty timetable wins
+    def searched(fraction, placed):
+        report('scheduling', 10 + 80 * fraction, placed)
+    
+    solve = solve_components if options['decompose'] else multi_start
+    timetable = solve(
+        graph, calendar, options['algorithm'], options['restarts'], options['optimise'], progress=searched
+    )
+    
+    exam_schedule = timetable.assignments()
+    
+    # A dry run only reports what the schedule would look like
+    if options.get('dry_run'):
+        report('evaluating', 90, len(exam_schedule))
+        return {
+            'message': 'Dry run: nothing was saved.',
+            'schedule': exam_schedule,
+            'metrics': evaluate(timetable)
+        }
+    
+    report('writing', 90, len(exam_schedule))
+    
+    # Exam dates and schedule rows are written in bulk in one transaction
+    write_schedule(timetable)
+    
+    return {
+        'message': 'تم جدولة الامتحانات بنجاح مع تقليل التعارضات!',
+        'schedule': exam_schedule
+    }
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def schedule_exams_auto(request):
     """Automatic exam scheduling algorithm"""
     try:
-        exams = Exam.objects.filter(date__isnull=True).select_related('courseID')
-        
-        # Sort by number of enrolled students (descending)
-        exam_student_counts = []
-        for exam in exams:
-            student_count = Student.objects.filter(courses=exam.courseID).count()
-            exam_student_counts.append((exam, student_count))
+        options = _schedule_options(request)
+    except ValueError as error:
+        return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        return Response(_run_schedule(options))
+    except Exception as error:
+        return Response({'error': f'حدث خطأ أثناء الجدولة: {str(error)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def schedule_job_create(request):
+    """Start automatic scheduling in the background and return its job ID"""
+    try:
+        options = _schedule_options(request)
+    except ValueError as error:
+        return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    job = ScheduleJob.objects.create(options=options)
+    jobs.submit(job, _run_schedule)
+    
+    return Response(jobs.job_status(job), status=status.HTTP_202_ACCEPTED)
+
+
+def _recover_jobs():
+    """Fail jobs whose worker died and resubmit queued jobs nobody picked up"""
+    jobs.fail_stale(ScheduleJob, phase='failed')
+    jobs.requeue_stale(ScheduleJob, lambda job: jobs.submit(job, _run_schedule))
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def schedule_job_detail(request, jobID):
+    """Poll a scheduling job"""
+    _recover_jobs()
+    try:
+        job = ScheduleJob.objects.get(jobID=jobID)
+    except ScheduleJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(jobs.job_status(job))
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def schedule_job_cancel(request, jobID):
+    """Ask a queued or running scheduling job to stop"""
+    _recover_jobs()
+    updated = ScheduleJob.objects.filter(jobID=jobID, status__in=['queued', 'running']).update(cancelRequested=True)
+    if not updated:
+        if not ScheduleJob.objects.filter(jobID=jobID).exists():
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'Job already finished'}, status=status.HTTP_409_CONFLICT)
+    
+    return Response({'message': 'Cancellation requested'})
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def schedule_repair(request):
+    """Repair the published timetable after late enrolment changes"""
+    try:
+        exams = list(Exam.objects.filter(date__isnull=False, time__isnull=False).order_by('examID'))
+        graph = ConflictGraph.from_db(exams)
         
-        exam_student_counts.sort(key=lambda x: x[1], reverse=True)
-        sorted_exams = [e[0] for e in exam_student_counts]
+        # Exams move only into upcoming slots of the configured calendar; slots
+        # off it that published exams already sit in are kept, closed
+        upcoming = ExamSlot.objects.filter(inCalendar=True, date__gt=datetime.now().date())
+        slots = list(upcoming.values_list('date', 'time'))
+        if not slots:
+            # No configured calendar: the default one scheduling falls back to
+            default = Calendar.working_days(datetime.now() + timedelta(days=1))
+            slots = [
+                (datetime.strptime(day, '%Y-%m-%d').date(), datetime.strptime(time, '%H:%M').time())
+                for day in default.days
+                for time in default.times
+            ]
+        calendar = Calendar.from_slots(slots, occupied={(exam.date, exam.time) for exam in exams})
+        position = {
+            (day, time): (d, t)
+            for d, day in enumerate(calendar.days)
+            for t, time in enumerate(calendar.times_on(d))
+        }
         
-        # Generate time slots (14 working days, 2 time slots per day)
-        time_slots = []
-        start_date = datetime.now() + timedelta(days=1)
-        days_assigned = 0
+        timetable = Timetable(graph, calendar)
+        for i, exam in enumerate(exams):
+            timetable.place(i, *position[(exam.date.isoformat(), exam.time.strftime('%H:%M'))])
         
-        while days_assigned < 14:
-            # Skip Friday (4) and Saturday (5)
-            if start_date.weekday() not in [4, 5]:
-                time_slots.append({
-                    'date': start_date.strftime('%Y-%m-%d'),
-                    'exams': [],
-                    'college_exam_count': {},
-                    'student_exam_map': {},
-                    'time_slots': {'09:00': [], '11:00': []}
-                })
-                days_assigned += 1
-            start_date += timedelta(days=1)
+        # Exams whose enrolled students no longer match their schedule rows
+        scheduled = {}
+        rows = Schedule.objects.filter(examID__date__isnull=False).values_list('examID', 'studentID')
+        for exam_id, student_id in rows.iterator(chunk_size=5000):
+            scheduled.setdefault(exam_id, set()).add(student_id)
         
-        exam_schedule = {}
+        added = {}
+        removed = {}
+        for i, exam in enumerate(exams):
+            enrolled = set(graph.students[i])
+            current = scheduled.get(exam.examID, set())
+            if enrolled != current:
+                added[i] = enrolled - current
+                removed[i] = current - enrolled
         
-        # Assign exams to time slots
-        for exam in sorted_exams:
-            students = list(Student.objects.filter(courses=exam.courseID).values_list('studentID', flat=True))
-            college = exam.college
-            assigned = False
-            
-            for slot in time_slots:
-                current_college_count = slot['college_exam_count'].get(college, 0)
-                if current_college_count >= 3:
-                    continue
-                
-                # Check for student conflicts
-                conflict = any(s in slot['student_exam_map'] for s in students)
-                if conflict:
-                    continue
-                
-                # Determine time (09:00 or 11:00)
-                time = '09:00'
-                if len(slot['time_slots']['09:00']) > 0 and len(slot['time_slots']['11:00']) == 0:
-                    time = '11:00'
-                
-                # If 11:00, check for high conflict with same college at 09:00
-                if time == '11:00':
-                    same_college_9am = [e for e in slot['time_slots']['09:00'] if e.college == college]
-                    if same_college_9am:
-                        # Check if any students overlap
-                        high_conflict = False
-                        for other_exam in same_college_9am:
-                            other_students = set(Student.objects.filter(courses=other_exam.courseID).values_list('studentID', flat=True))
-                            if set(students) & other_students:
-                                high_conflict = True
-                                break
-                        if high_conflict:
-                            continue
-                
-                # Assign exam
-                slot['exams'].append(exam)
-                slot['time_slots'][time].append(exam)
-                slot['college_exam_count'][college] = current_college_count + 1
-                exam_schedule[exam.examID] = {'date': slot['date'], 'time': time}
-                
-                for student_id in students:
-                    slot['student_exam_map'][student_id] = True
-                
-                assigned = True
-                break
+        # Exams tied to equivalent courses must move together, so leave them be
+        mapped_courses = set(CourseMappingRelation.objects.values_list('course_id', flat=True))
+        movable = {i for i, exam in enumerate(exams) if exam.courseID_id not in mapped_courses}
         
-        # Update exams in database
-        for exam_id, schedule_info in exam_schedule.items():
-            Exam.objects.filter(examID=exam_id).update(
-                date=schedule_info['date'],
-                time=schedule_info['time']
-            )
+        moved, unresolved = repair_schedule(timetable, set(added), movable)
         
-        # Create schedules
-        for exam in sorted_exams:
-            if exam.examID in exam_schedule:
-                students = Student.objects.filter(courses=exam.courseID)
-                for student in students:
-                    Schedule.objects.get_or_create(
-                        studentID=student,
-                        examID=exam,
-                        defaults={'college': exam.college}
-                    )
+        with transaction.atomic():
+            # Slots whose seats change: the moved exams' old ones and every edited exam's
+            changed_slots = {exams[i].slot_id for i in moved} | {exams[i].slot_id for i in removed}
+            moved_exams = []
+            for i in moved:
+                exam = exams[i]
+                exam.date = datetime.strptime(calendar.days[timetable.day_of[i]], '%Y-%m-%d').date()
+                exam.time = datetime.strptime(calendar.time_at(timetable.day_of[i], timetable.time_of[i]), '%H:%M').time()
+                moved_exams.append(exam)
+            slot_ids = ExamSlot.ids_for((exam.date, exam.time) for exam in moved_exams)
+            for exam in moved_exams:
+                exam.slot_id = slot_ids[(exam.date, exam.time)]
+            Exam.objects.bulk_update(moved_exams, ['date', 'time', 'slot'])
+            
+            # Hall and invigilator choices belonged to the old sitting
+            moved_ids = [exam.examID for exam in moved_exams]
+            Schedule.objects.filter(examID__in=moved_ids).update(hallID=None)
+            InstructorOnHall.objects.filter(examID__in=moved_ids).delete()
+            
+            Schedule.objects.bulk_create([
+                Schedule(examID=exams[i], studentID_id=student_id, college=exams[i].college)
+                for i, students in added.items()
+                for student_id in students
+            ], batch_size=2000, ignore_conflicts=True)
+            for i, students in removed.items():
+                if students:
+                    Schedule.objects.filter(examID=exams[i], studentID__in=students).delete()
+            
+            refresh_summaries([exams[i].examID for i in added] + moved_ids)
+            refresh_occupancy(changed_slots)
         
         return Response({
-            'message': 'تم جدولة الامتحانات بنجاح مع تقليل التعارضات!',
-            'schedule': exam_schedule
+            'message': 'Schedule repaired.',
+            'changed': [exams[i].examID for i in added],
+            'moved': {
+                exams[i].examID: {
+                    'date': calendar.days[timetable.day_of[i]],
+                    'time': calendar.time_at(timetable.day_of[i], timetable.time_of[i]),
+                }
+                for i in moved
+            },
+            'unresolved': [exams[i].examID for i in unresolved],
+            'schedulesAdded': sum(len(students) for students in added.values()),
+            'schedulesRemoved': sum(len(students) for students in removed.values()),
         })
     except Exception as error:
-        return Response({'error': f'حدث خطأ أثناء الجدولة: {str(error)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'error': f'Schedule repair failed: {str(error)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @api_view(['GET'])
@@ -317,6 +561,66 @@ def exam_schedules(request):
     return Response(result)
 
 
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def exam_slots(request):
+    """List the exam calendar, or replace it with a generated one"""
+    if request.method == 'GET':
+        slots = ExamSlot.objects.filter(inCalendar=True).annotate(examCount=Count('exams')).order_by('date', 'time')
+        return Response([
+            {'slotID': slot.slotID, 'date': str(slot.date), 'time': slot.time.strftime('%H:%M'), 'examCount': slot.examCount}
+            for slot in slots
+        ])
+    
+    try:
+        start = parser.parse(request.data.get('startDate')).date()
+        days = int(request.data.get('days', 14))
+        times = request.data.get('times') or list(DEFAULT_TIMES)
+        weekend = {int(day) for day in request.data.get('weekend', [4, 5])}
+        holidays = [parser.parse(day).date() for day in request.data.get('holidays', [])]
+        if not 1 <= days <= MAX_CALENDAR_DAYS:
+            raise ValueError(f'days must be between 1 and {MAX_CALENDAR_DAYS}')
+        if not weekend <= set(range(7)) or len(weekend) == 7:
+            raise ValueError('weekend must list weekdays 0-6 and leave at least one working day')
+        calendar = Calendar.working_days(start, days, weekend, times, holidays)
+        pairs = [
+            (datetime.strptime(day, '%Y-%m-%d').date(), parser.parse(time).time())
+            for day in calendar.days for time in calendar.times
+        ]
+    except (TypeError, ValueError, OverflowError) as error:
+        return Response(
+            {'error': f'startDate, days, times, weekend and holidays must describe a valid calendar: {error}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    with transaction.atomic():
+        slot_ids = ExamSlot.ids_for(pairs)
+        ExamSlot.objects.update(inCalendar=False)
+        ExamSlot.objects.filter(slotID__in=slot_ids.values()).update(inCalendar=True)
+    
+    return Response({'message': 'Exam calendar updated', 'slots': len(slot_ids)}, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def slot_free_halls(request, slotID):
+    """Free capacity of every hall during a slot, in one query"""
+    halls = Hall.objects.annotate(
+        occupied=Coalesce(Sum('occupancies__seats', filter=Q(occupancies__slot=slotID)), 0)
+    ).order_by('hallID')
+    
+    return Response([
+        {
+            'hallID': hall.hallID,
+            'name': hall.name,
+            'capacity': hall.capacity,
+            'occupied': hall.occupied,
+            'free': max(0, hall.capacity - hall.occupied)
+        }
+        for hall in halls
+    ])
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def exam_hall_invigilators(request):
@@ -324,7 +628,8 @@ def exam_hall_invigilators(request):
     date = request.GET.get('date')
     time = request.GET.get('time')
     
-    exams = Exam.objects.filter(date=date, time=time)
+    slot = ExamSlot.objects.filter(date=date, time=time).first()
+    exams = Exam.objects.filter(slot=slot) if slot else Exam.objects.none()
     results = []
     
     for exam in exams:
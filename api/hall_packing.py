@@ -0,0 +1,49 @@
+"""Packing a sitting's exams into the remaining capacity of its halls."""
+
+
+def _fewest_halls(demand, remaining):
+    """Halls to use for ``demand`` students, keeping their number minimal.
+
+    Takes the largest halls until the rest fits in a single hall, then the
+    tightest hall that still holds the rest. Returns (hallID, students) pairs.
+    """
+    chosen = []
+    open_halls = sorted((hall for hall in remaining if remaining[hall] > 0), key=lambda hall: -remaining[hall])
+    while demand > 0 and open_halls:
+        fits = [hall for hall in open_halls if remaining[hall] >= demand]
+        if fits:
+            hall = min(fits, key=lambda hall: remaining[hall])
+        else:
+            hall = open_halls[0]
+        take = min(demand, remaining[hall])
+        chosen.append((hall, take))
+        open_halls.remove(hall)
+        demand -= take
+    return chosen
+
+
+def pack_halls(demands, capacities):
+    """Assign every exam's students to halls.
+
+    ``demands`` maps examID to the number of students still without a hall
+    and ``capacities`` maps hallID to its free seats. Exams are packed
+    largest first so big exams get the big halls. Returns
+    ``(assignments, unassigned)``: examID -> [(hallID, students)] and
+    examID -> students left over once the halls are full.
+    """
+    remaining = dict(capacities)
+    assignments = {}
+    unassigned = {}
+    for exam_id in sorted(demands, key=lambda exam_id: (-demands[exam_id], exam_id)):
+        demand = demands[exam_id]
+        if demand <= 0:
+            continue
+        chosen = _fewest_halls(demand, remaining)
+        for hall, take in chosen:
+            remaining[hall] -= take
+        if chosen:
+            assignments[exam_id] = chosen
+        left = demand - sum(take for _, take in chosen)
+        if left:
+            unassigned[exam_id] = left
+    return assignments, unassigned
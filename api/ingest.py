@@ -0,0 +1,310 @@
+"""Streaming bulk ingestion of uploaded rosters (Excel, CSV, TSV or Parquet)."""
+import csv
+import io
+from itertools import islice
+from time import monotonic
+
+import openpyxl
+from django.db import transaction
+
+from .coenrolment import invalidate as invalidate_coenrolment
+from .models import Course, Enrollment, Hall, Student
+from .schedule_writer import chunked
+
+BATCH_SIZE = 2000
+ENROLLMENT_BATCH_SIZE = 10000
+
+
+XLSX_MAGIC = b'PK\x03\x04'
+PARQUET_MAGIC = b'PAR1'
+
+
+def detect_format(file):
+    """'xlsx', 'parquet', 'tsv' or 'csv' from magic bytes, then type and name"""
+    head = file.read(4)
+    file.seek(0)
+    if head == PARQUET_MAGIC:
+        return 'parquet'
+    if head == XLSX_MAGIC:
+        return 'xlsx'
+    content_type = (getattr(file, 'content_type', None) or '').lower()
+    name = (getattr(file, 'name', None) or '').lower()
+    if 'tab-separated' in content_type or name.endswith(('.tsv', '.tab')):
+        return 'tsv'
+    return 'csv'
+
+
+def iter_rows(file, min_row=2):
+    """Rows of an uploaded sheet, streamed whatever its format.
+
+    ``min_row`` counts the header as row 1 for Excel, CSV and TSV; Parquet
+    keeps its column names in the schema, so every record is a row.
+    """
+    file_format = detect_format(file)
+    if file_format == 'xlsx':
+        return _xlsx_rows(file, min_row)
+    if file_format == 'parquet':
+        return _parquet_rows(file)
+    return _delimited_rows(file, min_row, '\t' if file_format == 'tsv' else ',')
+
+
+def _xlsx_rows(file, min_row):
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(min_row=min_row, values_only=True)
+    finally:
+        workbook.close()
+
+
+def _delimited_rows(file, min_row, delimiter):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        yield from islice(csv.reader(text, delimiter=delimiter), min_row - 1, None)
+    finally:
+        # Leave the upload open for its owner; it may already be closed if the reader was abandoned
+        if not file.closed:
+            text.detach()
+
+
+def _parquet_rows(file):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError('Parquet uploads need the pyarrow package installed')
+    for batch in pq.ParquetFile(file).iter_batches(batch_size=BATCH_SIZE):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def _cell(row, index):
+    value = row[index] if len(row) > index else None
+    if isinstance(value, str):
+        value = value.strip()
+    return value
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+STUDENT_COUNTS = ('created', 'updated', 'unchanged', 'skipped')
+ENROLLMENT_COUNTS = ('created', 'unchanged', 'skipped', 'unknown')
+COURSE_COUNTS = ('created', 'unchanged', 'skipped')
+HALL_COUNTS = ('created', 'unchanged', 'skipped')
+
+
+class Report:
+    """Counts and unknown IDs gathered while ingesting, plus throughput.
+
+    A resumed upload starts from the counts and row number saved at its last
+    committed batch; throughput only covers rows read in this run. Rows that
+    are not applied, being invalid or naming an unknown ID, are passed to
+    ``on_reject``.
+    """
+
+    def __init__(self, keys=STUDENT_COUNTS, counts=None, rows=0, errors=None, on_reject=None):
+        self.counts = dict.fromkeys(keys, 0)
+        self.counts.update(counts or {})
+        self.rows = rows
+        self.errors = {key: set(ids) for key, ids in (errors or {}).items()}
+        self.first_row = rows
+        self.started = monotonic()
+        self.on_reject = on_reject
+
+    def add(self, key, count=1):
+        self.counts[key] += count
+
+    def reject(self, row):
+        if self.on_reject is not None:
+            self.on_reject(row)
+
+    def add_errors(self, key, ids):
+        if ids:
+            self.errors.setdefault(key, set()).update(ids)
+
+    def error_lists(self):
+        return {key: sorted(ids) for key, ids in self.errors.items()}
+
+    def rows_per_second(self):
+        seconds = monotonic() - self.started
+        read = self.rows - self.first_row
+        return round(read / seconds) if seconds else read
+
+    def as_dict(self):
+        return {
+            **self.counts,
+            'rows': self.rows,
+            'seconds': round(monotonic() - self.started, 2),
+            'rowsPerSecond': self.rows_per_second(),
+        }
+
+
+def ingest_students(rows, batch_size=BATCH_SIZE, report=None, checkpoint=None):
+    """Create or update students from (studentID, name, email) rows.
+
+    Rows are handled ``batch_size`` at a time: existing students are fetched
+    with one ``in_bulk`` and written back with ``bulk_create`` and
+    ``bulk_update`` in one transaction per batch, which also runs
+    ``checkpoint(report)``. Rows without a numeric ID or a name are skipped.
+    """
+    report = report or Report(STUDENT_COUNTS)
+    for batch in chunked(rows, batch_size):
+        # A later row for the same student wins; earlier ones count as skipped
+        records = {}
+        for row in batch:
+            student_id = _as_id(_cell(row, 0))
+            name = _cell(row, 1)
+            if student_id is None or not name:
+                report.reject(row)
+                continue
+            records[student_id] = (str(name), str(_cell(row, 2) or ''))
+
+        existing = Student.objects.in_bulk(list(records))
+        new = []
+        changed = []
+        unchanged = 0
+        for student_id, (name, email) in records.items():
+            student = existing.get(student_id)
+            if student is None:
+                new.append(Student(studentID=student_id, name=name, email=email))
+            elif (student.name, student.email) != (name, email):
+                student.name = name
+                student.email = email
+                changed.append(student)
+            else:
+                unchanged += 1
+
+        with transaction.atomic():
+            Student.objects.bulk_create(new)
+            Student.objects.bulk_update(changed, ['name', 'email'])
+            report.rows += len(batch)
+            report.add('skipped', len(batch) - len(records))
+            report.add('created', len(new))
+            report.add('updated', len(changed))
+            report.add('unchanged', unchanged)
+            if checkpoint:
+                checkpoint(report)
+    return report
+
+
+def _existing(model, field, ids):
+    """The subset of ``ids`` present in ``model``, looked up in IN batches"""
+    found = set()
+    for batch in chunked(sorted(ids), BATCH_SIZE):
+        found.update(model.objects.filter(**{f'{field}__in': batch}).values_list(field, flat=True))
+    return found
+
+
+def ingest_enrollments(rows, batch_size=ENROLLMENT_BATCH_SIZE, report=None, checkpoint=None):
+    """Insert the new (studentID, courseID) pairs among ``rows``.
+
+    Each batch's distinct pairs are resolved against students and courses
+    with IN queries and diffed against existing enrolments in memory, so
+    only new pairs reach ``bulk_create``; the batch commits together with
+    ``checkpoint(report)``. Unknown IDs are collected in ``report.errors``.
+    """
+    report = report or Report(ENROLLMENT_COUNTS)
+    for batch in chunked(rows, batch_size):
+        # Invalid and repeated rows count as skipped
+        pairs = set()
+        row_pairs = []
+        for row in batch:
+            pair = (_as_id(_cell(row, 0)), _as_id(_cell(row, 1)))
+            if None in pair:
+                report.reject(row)
+                continue
+            pairs.add(pair)
+            row_pairs.append((row, pair))
+
+        students = _existing(Student, 'studentID', {student_id for student_id, _ in pairs})
+        courses = _existing(Course, 'courseID', {course_id for _, course_id in pairs})
+        known = {(s, c) for s, c in pairs if s in students and c in courses}
+        if len(known) < len(pairs):
+            for row, pair in row_pairs:
+                if pair not in known:
+                    report.reject(row)
+
+        existing = set()
+        for ids in chunked(sorted({s for s, _ in known}), BATCH_SIZE):
+            existing.update(Enrollment.objects.filter(student_id__in=ids).values_list('student_id', 'course_id'))
+        new = sorted(known - existing)
+
+        with transaction.atomic():
+            for pairs_batch in chunked(new, BATCH_SIZE):
+                Enrollment.objects.bulk_create(
+                    [Enrollment(student_id=s, course_id=c) for s, c in pairs_batch], ignore_conflicts=True
+                )
+            report.rows += len(batch)
+            report.add('skipped', len(batch) - len(pairs))
+            report.add('unknown', len(pairs) - len(known))
+            report.add('unchanged', len(known) - len(new))
+            report.add('created', len(new))
+            report.add_errors('unknownStudents', {s for s, _ in pairs} - students)
+            report.add_errors('unknownCourses', {c for _, c in pairs} - courses)
+            if checkpoint:
+                checkpoint(report)
+            # bulk_create sends no signals, so the cached co-enrolment matrix is rebuilt
+            invalidate_coenrolment()
+    return report
+
+
+def ingest_courses(rows, batch_size=BATCH_SIZE, report=None):
+    """Create the (courseName, college) rows that do not exist yet"""
+    report = report or Report(COURSE_COUNTS)
+    existing = set(Course.objects.values_list('courseName', 'college'))
+    for batch in chunked(rows, batch_size):
+        report.rows += len(batch)
+        new = {}
+        for row in batch:
+            name = _cell(row, 0)
+            if not name:
+                report.add('skipped')
+                report.reject(row)
+                continue
+            key = (str(name), str(_cell(row, 1) or ''))
+            if key in existing or key in new:
+                report.add('unchanged')
+                continue
+            new[key] = Course(courseName=key[0], college=key[1])
+        with transaction.atomic():
+            Course.objects.bulk_create(new.values())
+        existing.update(new)
+        report.add('created', len(new))
+    return report
+
+
+def ingest_halls(rows, batch_size=BATCH_SIZE, report=None):
+    """Create the halls whose names do not exist yet; existing halls are left alone"""
+    report = report or Report(HALL_COUNTS)
+    existing = set(Hall.objects.values_list('name', flat=True))
+    for batch in chunked(rows, batch_size):
+        report.rows += len(batch)
+        new = {}
+        for row in batch:
+            name = _cell(row, 0)
+            capacity = _as_id(_cell(row, 1))
+            if not name or capacity is None:
+                report.add('skipped')
+                report.reject(row)
+                continue
+            name = str(name)
+            if name in existing or name in new:
+                report.add('unchanged')
+                continue
+            new[name] = Hall(name=name, capacity=capacity)
+        with transaction.atomic():
+            Hall.objects.bulk_create(new.values())
+        existing.update(new)
+        report.add('created', len(new))
+    return report
+
+
+# Ingester and report counts behind each upload endpoint
+INGESTERS = {
+    'students': (ingest_students, STUDENT_COUNTS),
+    'courses': (ingest_courses, COURSE_COUNTS),
+    'enrollments': (ingest_enrollments, ENROLLMENT_COUNTS),
+    'halls': (ingest_halls, HALL_COUNTS),
+}
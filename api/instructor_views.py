@@ -2,59 +2,85 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework import status
-from django.db.models import Count
-from dateutil import parser
-from datetime import datetime
+from django.db import transaction
+from django.db.models import Count, Q
 
 from .models import (
     Instructor, AvailabilityDay, AvailabilityTime, Exam, Hall, Schedule,
-    InstructorOnHall, Course
+    InstructorOnHall, Course, ExamSlot
 )
+from .availability_index import get_index, invalidate as invalidate_availability
+from .invigilation import assign_invigilators
+from .summaries import refresh_summaries
+
+# Largest page selection_halls returns for one request
+MAX_PAGE_SIZE = 500
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def selection_halls(request):
     """Get halls with their scheduled exams and instructors"""
-    halls = Hall.objects.prefetch_related('schedules__examID').all()
+    pairs = Schedule.objects.filter(hallID__isnull=False, examID__isnull=False)
+    college = request.GET.get('college')
+    if college:
+        pairs = pairs.filter(examID__college=college)
+    date = request.GET.get('date')
+    if date:
+        pairs = pairs.filter(examID__date=date)
+    
+    # Cursor pagination over (hallID, examID), e.g. ?limit=50&cursor=12:340
+    limit = request.GET.get('limit')
+    cursor = request.GET.get('cursor')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return Response({'error': f'limit must be a whole number from 1 to {MAX_PAGE_SIZE}'}, status=status.HTTP_400_BAD_REQUEST)
+    if cursor:
+        try:
+            hall_id, exam_id = (int(part) for part in cursor.split(':'))
+        except ValueError:
+            return Response({'error': 'cursor must look like <hallID>:<examID>'}, status=status.HTTP_400_BAD_REQUEST)
+        pairs = pairs.filter(Q(hallID__gt=hall_id) | Q(hallID=hall_id, examID__gt=exam_id))
+    
+    # One row per (hall, exam) with its student count
+    pairs = pairs.values(
+        'hallID', 'hallID__name', 'examID', 'examID__name', 'examID__date', 'examID__time'
+    ).annotate(students=Count('scheduleID')).order_by('hallID', 'examID')
+    if limit is not None:
+        pairs = pairs[:limit]
+    pairs = list(pairs)
+    
+    invigilators = {}
+    if pairs:
+        for hall_id, exam_id, name in InstructorOnHall.objects.filter(
+            hallID__in={pair['hallID'] for pair in pairs},
+            examID__in={pair['examID'] for pair in pairs}
+        ).values_list('hallID', 'examID', 'instructorID__name').distinct().order_by('hallID', 'examID', 'instructorID'):
+            invigilators.setdefault((hall_id, exam_id), []).append(name)
     
     selection = []
-    seen = set()
+    for pair in pairs:
+        selection.append({
+            'examID': pair['examID'],
+            'hall': pair['hallID__name'],
+            'name': pair['examID__name'],
+            'NUM': pair['students'],
+            'date': str(pair['examID__date']) if pair['examID__date'] else None,
+            'time': str(pair['examID__time']) if pair['examID__time'] else None,
+            'invigilators': ' / '.join(invigilators.get((pair['hallID'], pair['examID']), []))
+        })
     
-    for hall in halls:
-        schedules = hall.schedules.all()
-        
-        if schedules.exists():
-            for schedule in schedules:
-                exam = schedule.examID
-                if not exam:
-                    continue
-                
-                unique_key = f"{hall.hallID}-{exam.examID}"
-                
-                if unique_key not in seen:
-                    count = Schedule.objects.filter(examID=exam, hallID=hall).count()
-                    
-                    instructors = Instructor.objects.filter(
-                        instructor_on_halls__hallID=hall,
-                        instructor_on_halls__examID=exam
-                    ).distinct()
-                    
-                    instructor_names = ' / '.join([inst.name for inst in instructors]) if instructors.exists() else ''
-                    
-                    selection.append({
-                        'examID': exam.examID,
-                        'hall': hall.name,
-                        'name': exam.name,
-                        'NUM': count,
-                        'date': str(exam.date) if exam.date else None,
-                        'time': str(exam.time) if exam.time else None,
-                        'invigilators': instructor_names
-                    })
-                    
-                    seen.add(unique_key)
-    
-    return Response(selection)
+    if limit is None:
+        return Response(selection)
+    
+    next_cursor = None
+    if len(pairs) == limit:
+        next_cursor = f"{pairs[-1]['hallID']}:{pairs[-1]['examID']}"
+    return Response({'results': selection, 'nextCursor': next_cursor})
 
 
 @api_view(['GET'])
@@ -69,75 +95,20 @@ def invigilator_exist(request, examID):
     if not exam.date or not exam.time:
         return Response({'error': 'الامتحان غير موجود أو لا يحتوي على تاريخ أو وقت'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Get all instructors with their availability
-    instructors = Instructor.objects.prefetch_related(
-        'availability_days__availability_slots'
-    ).all()
-    
-    # Filter instructors available at exam date and time
-    available_instructors = []
-    
-    for instructor in instructors:
-        is_available = False
-        
-        for availability_day in instructor.availability_days.all():
-            # Parse availability date (format: "01Jan", "15Feb", etc.)
-            try:
-                # Extract day and month from format like "01Jan"
-                day_str = availability_day.date[:2]
-                month_str = availability_day.date[2:]
-                
-                # Create a date string and compare
-                date_str = f"2024-{month_str}-{day_str}"
-                availability_date = parser.parse(date_str)
-                
-                # Check if dates match (day and month)
-                if availability_date.day == exam.date.day and availability_date.month == exam.date.month:
-                    # Check time slots
-                    for time_slot in availability_day.availability_slots.all():
-                        # Parse time (format: "9:00AM", "11:00AM")
-                        try:
-                            slot_time = parser.parse(time_slot.time)
-                            exam_time = datetime.strptime(str(exam.time), '%H:%M:%S')
-                            
-                            if slot_time.hour == exam_time.hour and slot_time.minute == exam_time.minute:
-                                is_available = True
-                                break
-                        except:
-                            continue
-                
-                if is_available:
-                    break
-            except:
-                continue
-        
-        if is_available:
-            available_instructors.append(instructor)
-    
-    # Filter out instructors already assigned to overlapping exams
-    overlapping_exams = Exam.objects.filter(date=exam.date, time=exam.time).exclude(examID=exam.examID)
-    
-    my_exam_instructors = InstructorOnHall.objects.filter(examID=exam).values_list('instructorID', flat=True)
-    
-    final_available_instructors = []
-    for instructor in available_instructors:
-        is_assigned_elsewhere = InstructorOnHall.objects.filter(
-            instructorID=instructor,
-            examID__in=overlapping_exams
-        ).exclude(instructorID__in=my_exam_instructors).exists()
-        
-        if not is_assigned_elsewhere:
-            final_available_instructors.append({
-                'instructorID': instructor.instructorID,
-                'name': instructor.name,
-                'email': instructor.email
-            })
+    # Free at the exam's time and not invigilating another exam of the slot,
+    # answered by a few bitwise operations over all instructors at once
+    other_exams = Exam.objects.filter(slot=exam.slot_id).exclude(examID=exam.examID).values_list('examID', flat=True)
+    final_available_instructors = [
+        {'instructorID': instructor_id, 'name': name, 'email': email}
+        for instructor_id, name, email in get_index().available_for(exam.date, exam.time, exam.examID, other_exams)
+    ]
     
     return Response(final_available_instructors)
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@transaction.atomic
 def select_instructor(request, hall, examID):
     """Assign instructors to a hall for an exam"""
     try:
@@ -147,6 +118,7 @@ def select_instructor(request, hall, examID):
         return Response({'error': 'Hall or Exam not found'}, status=status.HTTP_404_NOT_FOUND)
     
     selected_invigilators = request.data.get('selectedInvigilators', [])
+    touched = {exam.examID}
     
     for invigilator_data in selected_invigilators:
         instructor_id = invigilator_data.get('instructorID')
@@ -162,7 +134,7 @@ def select_instructor(request, hall, examID):
             )
             
             # Assign to other exams at same date/time using the same hall
-            same_time_exams = Exam.objects.filter(date=exam.date, time=exam.time).exclude(examID=exam.examID)
+            same_time_exams = Exam.objects.filter(slot=exam.slot_id).exclude(examID=exam.examID)
             
             for other_exam in same_time_exams:
                 # Check if this hall is used for the other exam
@@ -172,14 +144,86 @@ def select_instructor(request, hall, examID):
                         hallID=hall_obj,
                         instructorID=instructor
                     )
+                    touched.add(other_exam.examID)
         except Instructor.DoesNotExist:
             continue
     
+    refresh_summaries(touched)
+    
     return Response({'message': 'Update of Instructor on hall'})
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+def auto_assign_invigilators(request):
+    """Assign invigilators to every used hall of every slot in one go"""
+    try:
+        per_hall = max(1, int(request.data.get('perHall', 1)))
+    except (TypeError, ValueError):
+        return Response({'error': 'perHall must be a whole number'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    slots = ExamSlot.objects.filter(exams__isnull=False).distinct()
+    slot_ids = request.data.get('slotIDs')
+    if slot_ids:
+        slots = slots.filter(slotID__in=slot_ids)
+    slot_at = {(slot.date, slot.time): slot.slotID for slot in slots}
+    
+    # Instructor x slot availability in one scan
+    available = {}
+    for instructor_id, date, time in AvailabilityTime.objects.filter(
+        availabilityId__availableOn__in={date for date, _ in slot_at}
+    ).values_list('availabilityId__instructorID', 'availabilityId__availableOn', 'availableAt'):
+        slot_id = slot_at.get((date, time))
+        if slot_id is not None:
+            available.setdefault(slot_id, set()).add(instructor_id)
+    
+    # Halls in use per slot and the exams sitting in each of them
+    hall_exams = {}
+    for slot_id, hall_id, exam_id in Schedule.objects.filter(
+        examID__slot__in=slots, hallID__isnull=False
+    ).values_list('examID__slot', 'hallID', 'examID').distinct():
+        hall_exams.setdefault((slot_id, hall_id), set()).add(exam_id)
+    
+    # Existing duties count towards both the halls and the instructors' load
+    watching = {}
+    load = {}
+    for slot_id, hall_id, instructor_id in InstructorOnHall.objects.filter(
+        examID__slot__isnull=False
+    ).values_list('examID__slot', 'hallID', 'instructorID').distinct():
+        watching.setdefault((slot_id, hall_id), set()).add(instructor_id)
+        load[instructor_id] = load.get(instructor_id, 0) + 1
+        available.get(slot_id, set()).discard(instructor_id)
+    
+    demand = {
+        key: per_hall - len(watching.get(key, ()))
+        for key in hall_exams
+        if len(watching.get(key, ())) < per_hall
+    }
+    assignments, shortfall = assign_invigilators(demand, available, load)
+    
+    rows = [
+        InstructorOnHall(examID_id=exam_id, hallID_id=hall_id, instructorID_id=instructor_id)
+        for slot_id, hall_id, instructor_id in assignments
+        for exam_id in hall_exams[(slot_id, hall_id)]
+    ]
+    with transaction.atomic():
+        InstructorOnHall.objects.bulk_create(rows, ignore_conflicts=True)
+        refresh_summaries(row.examID_id for row in rows)
+        invalidate_availability()
+    
+    return Response({
+        'message': 'Invigilators assigned',
+        'assigned': len(assignments),
+        'shortfall': [
+            {'slotID': slot_id, 'hallID': hall_id, 'missing': missing}
+            for (slot_id, hall_id), missing in sorted(shortfall.items())
+        ],
+    })
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@transaction.atomic
 def instructors_for_exam_and_hall_delete(request):
     """Remove instructor assignment from exam and hall"""
     exam_id = request.data.get('examID')
@@ -192,6 +236,8 @@ def instructors_for_exam_and_hall_delete(request):
         instructorID=instructor_id
     ).delete()
     
+    refresh_summaries(Exam.objects.filter(examID=exam_id).values_list('examID', flat=True))
+    
     return Response({'message': 'remove the instructor.'})
 
 
@@ -0,0 +1,92 @@
+"""Automatic invigilator assignment over every (slot, hall) of the term."""
+from collections import deque
+
+
+def assign_invigilators(demand, available, load):
+    """Fill every (slot, hall) with invigilators, balancing their load.
+
+    ``demand`` maps (slot, hall) to the number of invigilators still needed,
+    ``available`` maps slot to the instructors free at that time and ``load``
+    maps instructor to the halls they already watch. Nobody watches two halls
+    in the same slot. Returns ``(assignments, shortfall)``: a list of
+    (slot, hall, instructor) and (slot, hall) -> invigilators still missing.
+    """
+    load = dict(load)
+    free = {slot: set(instructors) for slot, instructors in available.items()}
+    held = {}
+    assignments = {}
+    shortfall = {}
+
+    # Scarce slots first so they are not starved by the easy ones
+    def scarcity(item):
+        (slot, hall), needed = item
+        return (len(free.get(slot, ())) - needed, slot, hall)
+
+    for (slot, hall), needed in sorted(demand.items(), key=scarcity):
+        candidates = free.get(slot, set())
+        for _ in range(needed):
+            if not candidates:
+                shortfall[(slot, hall)] = shortfall.get((slot, hall), 0) + 1
+                continue
+            instructor = min(candidates, key=lambda i: (load.get(i, 0), i))
+            candidates.discard(instructor)
+            load[instructor] = load.get(instructor, 0) + 1
+            assignments[(slot, instructor)] = hall
+            held.setdefault(instructor, set()).add(slot)
+
+    _balance(assignments, held, free, load)
+    return [(slot, hall, instructor) for (slot, instructor), hall in assignments.items()], shortfall
+
+
+def _balance(assignments, held, free, load):
+    """Shift duties from busy to idle instructors along alternating paths.
+
+    An edge a -> b exists when a holds a duty in a slot where b is free.
+    Moving one duty along every edge of a path lowers the first instructor's
+    load by one and raises the last one's, which is the augmenting step of a
+    min-cost flow with convex per-instructor cost.
+    """
+    while True:
+        improved = False
+        for start in sorted(held, key=lambda i: -load[i]):
+            path = _shift_path(start, held, free, load)
+            if path is None:
+                continue
+            for a, slot, b in path:
+                hall = assignments.pop((slot, a))
+                assignments[(slot, b)] = hall
+                held[a].discard(slot)
+                held.setdefault(b, set()).add(slot)
+                free[slot].discard(b)
+                free[slot].add(a)
+            load[start] -= 1
+            load[path[-1][2]] = load.get(path[-1][2], 0) + 1
+            improved = True
+            break
+        if not improved:
+            return
+
+
+def _shift_path(start, held, free, load):
+    """Shortest path of (giver, slot, taker) steps ending at an instructor
+    with at least two fewer duties than ``start``, or None"""
+    target = load[start] - 2
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        giver = queue.popleft()
+        for slot in sorted(held.get(giver, ())):
+            for taker in sorted(free[slot]):
+                if taker in parents:
+                    continue
+                parents[taker] = (giver, slot)
+                if load.get(taker, 0) <= target:
+                    path = []
+                    node = taker
+                    while parents[node] is not None:
+                        previous, step_slot = parents[node]
+                        path.append((previous, step_slot, node))
+                        node = previous
+                    return path[::-1]
+                queue.append(taker)
+    return None
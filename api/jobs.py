@@ -0,0 +1,204 @@
+"""Background execution of long-running scheduling and upload work."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+from time import monotonic
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import ledger
+from .ingest import INGESTERS, Report, iter_rows
+from .models import ScheduleJob, UploadJob
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'SCHEDULE_JOB_WORKERS', 1),
+    thread_name_prefix='schedule-job',
+)
+_upload_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'UPLOAD_JOB_WORKERS', 1),
+    thread_name_prefix='upload-job',
+)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobProgress:
+    """Progress callback handed to a running job.
+
+    Writes are throttled to one every ``interval`` seconds unless the phase
+    changes. Each write renews the job's heartbeat and picks up a pending
+    cancellation request.
+    """
+
+    def __init__(self, job_id, interval=0.5):
+        self.job_id = job_id
+        self.interval = interval
+        self.phase = None
+        self.last_write = 0
+
+    def __call__(self, phase, percent, placed=None, total=None):
+        now = monotonic()
+        if phase == self.phase and now - self.last_write < self.interval:
+            return
+        self.phase = phase
+        self.last_write = now
+
+        fields = {'phase': phase, 'progress': round(percent, 1), 'heartbeatAt': timezone.now()}
+        if placed is not None:
+            fields['examsPlaced'] = placed
+        if total is not None:
+            fields['examsTotal'] = total
+        ScheduleJob.objects.filter(jobID=self.job_id).update(**fields)
+        if ScheduleJob.objects.filter(jobID=self.job_id, cancelRequested=True).exists():
+            raise JobCancelled()
+
+
+def submit(job, target):
+    """Run ``target(job.options, progress)`` on a worker once the job row is committed"""
+    transaction.on_commit(lambda: _executor.submit(_run, job.jobID, target))
+
+
+def _run(job_id, target):
+    close_old_connections()
+    try:
+        # Claim the job, so one resubmitted by requeue_stale still runs once
+        now = timezone.now()
+        claimed = ScheduleJob.objects.filter(jobID=job_id, status='queued').update(
+            status='running', startedAt=now, heartbeatAt=now
+        )
+        if not claimed:
+            return
+
+        try:
+            job = ScheduleJob.objects.get(jobID=job_id)
+            if job.cancelRequested:
+                raise JobCancelled()
+            result = target(job.options, JobProgress(job_id))
+        except JobCancelled:
+            _finish(job_id, 'cancelled', phase='cancelled')
+        except Exception as error:
+            _finish(job_id, 'failed', phase='failed', error=str(error))
+        else:
+            _finish(job_id, 'done', phase='done', progress=100, result=result)
+    finally:
+        connection.close()
+
+
+def _finish(job_id, status, **fields):
+    ScheduleJob.objects.filter(jobID=job_id).update(status=status, finishedAt=timezone.now(), **fields)
+
+
+def fail_stale(model, **fields):
+    """Fail running jobs whose worker stopped heartbeating, e.g. after a restart"""
+    lease = timedelta(seconds=getattr(settings, 'JOB_LEASE_SECONDS', 300))
+    now = timezone.now()
+    silent = Q(heartbeatAt__lt=now - lease) | Q(heartbeatAt__isnull=True, startedAt__lt=now - lease)
+    return model.objects.filter(silent, status='running').update(
+        status='failed', finishedAt=now, error='The worker stopped responding', **fields
+    )
+
+
+def requeue_stale(model, submit):
+    """Resubmit queued jobs no worker claimed within the lease, e.g. lost in a restart.
+
+    ``submit(job)`` hands a job to this process's workers. A job queued
+    behind a long run may be submitted twice, but only one worker claims it.
+    """
+    lease = timedelta(seconds=getattr(settings, 'JOB_LEASE_SECONDS', 300))
+    now = timezone.now()
+    waiting = Q(heartbeatAt__lt=now - lease) | Q(heartbeatAt__isnull=True, createdAt__lt=now - lease)
+    for job in model.objects.filter(waiting, status='queued'):
+        # Restamp first, so concurrent polls resubmit a job only once
+        if model.objects.filter(waiting, jobID=job.jobID, status='queued').update(heartbeatAt=now):
+            submit(job)
+
+
+def job_status(job):
+    """Polling payload for a job"""
+    end = job.finishedAt or timezone.now()
+    elapsed = (end - job.startedAt).total_seconds() if job.startedAt else 0
+    return {
+        'jobID': job.jobID,
+        'status': job.status,
+        'phase': job.phase,
+        'progress': job.progress,
+        'examsPlaced': job.examsPlaced,
+        'examsTotal': job.examsTotal,
+        'elapsed': round(elapsed, 2),
+        'cancelRequested': job.cancelRequested,
+        'result': job.result,
+        'error': job.error,
+    }
+
+
+# Uploads that can run as jobs: their ingesters checkpoint every batch
+UPLOAD_INGESTERS = {kind: INGESTERS[kind] for kind in ('students', 'enrollments')}
+
+
+def submit_upload(job):
+    """Ingest ``job.file`` on a worker once the job row is committed"""
+    transaction.on_commit(lambda: _upload_executor.submit(_run_upload, job.jobID))
+
+
+def _run_upload(job_id):
+    close_old_connections()
+    try:
+        # Claim the job, so one resubmitted by requeue_stale still runs once
+        now = timezone.now()
+        claimed = UploadJob.objects.filter(jobID=job_id, status='queued').update(
+            status='running', startedAt=now, heartbeatAt=now, finishedAt=None, error=None
+        )
+        if not claimed:
+            return
+
+        def checkpoint(report):
+            # Runs inside each batch's transaction, so the offset matches what was written
+            UploadJob.objects.filter(jobID=job_id).update(
+                rowsProcessed=report.rows,
+                rowsPerSecond=report.rows_per_second(),
+                counts=report.counts,
+                errors=report.error_lists(),
+                heartbeatAt=timezone.now(),
+            )
+
+        try:
+            job = UploadJob.objects.get(jobID=job_id)
+            ingest, keys = UPLOAD_INGESTERS[job.kind]
+            report = Report(keys, job.counts, job.rowsProcessed, job.errors)
+            with job.file.open('rb') as file:
+                # Rows before the last committed batch were written by an earlier run
+                ingest(islice(iter_rows(file), job.rowsProcessed, None), report=report, checkpoint=checkpoint)
+                # Later uploads of the endpoint diff against this file, not the import before it
+                ledger.record_import(job.kind, ledger.fingerprint(file), report)
+        except Exception as error:
+            _finish_upload(job_id, 'failed', error=str(error))
+        else:
+            _finish_upload(job_id, 'done', rowsPerSecond=report.rows_per_second())
+    finally:
+        connection.close()
+
+
+def _finish_upload(job_id, status, **fields):
+    UploadJob.objects.filter(jobID=job_id).update(status=status, finishedAt=timezone.now(), **fields)
+
+
+def upload_job_status(job):
+    """Polling payload for an upload job"""
+    end = job.finishedAt or timezone.now()
+    elapsed = (end - job.startedAt).total_seconds() if job.startedAt else 0
+    return {
+        'jobID': job.jobID,
+        'kind': job.kind,
+        'status': job.status,
+        'rowsProcessed': job.rowsProcessed,
+        'rowsPerSecond': job.rowsPerSecond,
+        'elapsed': round(elapsed, 2),
+        'counts': job.counts,
+        'errors': job.errors,
+        'error': job.error,
+    }
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_rename_admin_adminn'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleJob',
+            fields=[
+                ('jobID', models.AutoField(db_column='jobID', primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', max_length=20)),
+                ('phase', models.CharField(default='queued', max_length=50)),
+                ('progress', models.FloatField(default=0)),
+                ('examsTotal', models.IntegerField(db_column='examsTotal', default=0)),
+                ('examsPlaced', models.IntegerField(db_column='examsPlaced', default=0)),
+                ('options', models.JSONField(default=dict)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('cancelRequested', models.BooleanField(db_column='cancelRequested', default=False)),
+                ('createdAt', models.DateTimeField(auto_now_add=True, db_column='createdAt')),
+                ('startedAt', models.DateTimeField(blank=True, db_column='startedAt', null=True)),
+                ('heartbeatAt', models.DateTimeField(blank=True, db_column='heartbeatAt', null=True)),
+                ('finishedAt', models.DateTimeField(blank=True, db_column='finishedAt', null=True)),
+            ],
+            options={
+                'db_table': 'schedule_jobs',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_slots(apps, schema_editor):
+    Exam = apps.get_model('api', 'Exam')
+    ExamSlot = apps.get_model('api', 'ExamSlot')
+    pairs = Exam.objects.filter(date__isnull=False, time__isnull=False).values_list('date', 'time').distinct()
+    for date, time in pairs:
+        slot, _ = ExamSlot.objects.get_or_create(date=date, time=time)
+        Exam.objects.filter(date=date, time=time).update(slot=slot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_schedulejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSlot',
+            fields=[
+                ('slotID', models.AutoField(db_column='slotID', primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('inCalendar', models.BooleanField(db_column='inCalendar', default=False)),
+            ],
+            options={
+                'db_table': 'exam_slots',
+                'ordering': ['date', 'time'],
+                'unique_together': {('date', 'time')},
+            },
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='slot',
+            field=models.ForeignKey(blank=True, db_column='slotID', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='exams', to='api.examslot'),
+        ),
+        migrations.RunPython(backfill_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_examslot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSummary',
+            fields=[
+                ('examID', models.OneToOneField(db_column='examID', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='api.exam')),
+                ('studentCount', models.IntegerField(db_column='studentCount', default=0)),
+                ('withoutHalls', models.IntegerField(db_column='withoutHalls', default=0)),
+                ('halls', models.JSONField(default=list)),
+                ('updatedAt', models.DateTimeField(auto_now=True, db_column='updatedAt')),
+            ],
+            options={
+                'db_table': 'exam_summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_occupancy(apps, schema_editor):
+    Schedule = apps.get_model('api', 'Schedule')
+    HallOccupancy = apps.get_model('api', 'HallOccupancy')
+    seats = Schedule.objects.filter(
+        examID__slot__isnull=False, hallID__isnull=False
+    ).values_list('examID__slot', 'hallID').annotate(seats=Count('scheduleID'))
+    HallOccupancy.objects.bulk_create([
+        HallOccupancy(slot_id=slot_id, hallID_id=hall_id, seats=count)
+        for slot_id, hall_id, count in seats
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_examsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HallOccupancy',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('seats', models.IntegerField(default=0)),
+                ('hallID', models.ForeignKey(db_column='hallID', on_delete=django.db.models.deletion.CASCADE, related_name='occupancies', to='api.hall')),
+                ('slot', models.ForeignKey(db_column='slotID', on_delete=django.db.models.deletion.CASCADE, related_name='occupancies', to='api.examslot')),
+            ],
+            options={
+                'db_table': 'hall_occupancies',
+                'unique_together': {('hallID', 'slot')},
+            },
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
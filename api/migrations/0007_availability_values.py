@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:06
+
+from datetime import date
+
+from dateutil import parser
+from django.db import migrations, models
+
+
+# The parsing is copied here so later changes to api.availability do not
+# change what this migration does
+def parse_day(text, reference):
+    """First date on or after ``reference`` matching a "01Jan"-style day"""
+    try:
+        parsed = parser.parse(f"2024-{text[2:]}-{text[:2]}")
+    except (TypeError, ValueError, OverflowError):
+        return None
+    reference = reference.date() if reference else date.today()
+    for year in range(reference.year, reference.year + 9):
+        try:
+            day = date(year, parsed.month, parsed.day)
+        except ValueError:
+            continue
+        if day >= reference:
+            return day
+
+
+def parse_time(text):
+    try:
+        return parser.parse(text).time()
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def parse_availability(apps, schema_editor):
+    AvailabilityDay = apps.get_model('api', 'AvailabilityDay')
+    AvailabilityTime = apps.get_model('api', 'AvailabilityTime')
+    days = list(AvailabilityDay.objects.all())
+    for day in days:
+        day.availableOn = parse_day(day.date, day.createdAt)
+    AvailabilityDay.objects.bulk_update(days, ['availableOn'], batch_size=1000)
+    times = list(AvailabilityTime.objects.all())
+    for time in times:
+        time.availableAt = parse_time(time.time)
+    AvailabilityTime.objects.bulk_update(times, ['availableAt'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_halloccupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availabilityday',
+            name='availableOn',
+            field=models.DateField(blank=True, db_column='availableOn', db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='availabilitytime',
+            name='availableAt',
+            field=models.TimeField(blank=True, db_column='availableAt', db_index=True, null=True),
+        ),
+        migrations.RunPython(parse_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_availability_values'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadJob',
+            fields=[
+                ('jobID', models.AutoField(db_column='jobID', primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('students', 'Students'), ('enrollments', 'Enrollments')], max_length=20)),
+                ('file', models.FileField(upload_to='upload_jobs/')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('rowsProcessed', models.IntegerField(db_column='rowsProcessed', default=0)),
+                ('rowsPerSecond', models.IntegerField(db_column='rowsPerSecond', default=0)),
+                ('counts', models.JSONField(default=dict)),
+                ('errors', models.JSONField(default=dict)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('createdAt', models.DateTimeField(auto_now_add=True, db_column='createdAt')),
+                ('startedAt', models.DateTimeField(blank=True, db_column='startedAt', null=True)),
+                ('heartbeatAt', models.DateTimeField(blank=True, db_column='heartbeatAt', null=True)),
+                ('finishedAt', models.DateTimeField(blank=True, db_column='finishedAt', null=True)),
+            ],
+            options={
+                'db_table': 'upload_jobs',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_uploadjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadLedger',
+            fields=[
+                ('ledgerID', models.AutoField(db_column='ledgerID', primary_key=True, serialize=False)),
+                ('endpoint', models.CharField(max_length=20)),
+                ('sha256', models.CharField(max_length=64)),
+                ('rows', models.IntegerField(default=0)),
+                ('rowHashes', models.BinaryField(db_column='rowHashes', default=bytes)),
+                ('errors', models.JSONField(default=dict)),
+                ('importedAt', models.DateTimeField(auto_now=True, db_column='importedAt')),
+            ],
+            options={
+                'db_table': 'upload_ledger',
+                'indexes': [models.Index(fields=['endpoint', '-importedAt'], name='upload_ledg_endpoin_31eeb8_idx')],
+                'unique_together': {('endpoint', 'sha256')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_uploadledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=1)),
+            ],
+            options={
+                'db_table': 'cache_versions',
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.hashers import make_password, check_password
 
+from .availability import parse_day, parse_time
+
 
 class Adminn(models.Model):
     id = models.AutoField(primary_key=True)
@@ -74,17 +76,53 @@ class CourseMappingRelation(models.Model):
         unique_together = ('course_mapping', 'course')
 
 
+class ExamSlot(models.Model):
+    slotID = models.AutoField(primary_key=True, db_column='slotID')
+    date = models.DateField()
+    time = models.TimeField()
+    inCalendar = models.BooleanField(default=False, db_column='inCalendar')
+
+    class Meta:
+        db_table = 'exam_slots'
+        unique_together = ('date', 'time')
+        ordering = ['date', 'time']
+
+    @classmethod
+    def ids_for(cls, pairs):
+        """Map (date, time) pairs to slot IDs, creating the missing slots"""
+        pairs = set(pairs)
+        cls.objects.bulk_create(
+            [cls(date=date, time=time) for date, time in pairs],
+            ignore_conflicts=True
+        )
+        dates = {date for date, _ in pairs}
+        return {
+            (slot.date, slot.time): slot.slotID
+            for slot in cls.objects.filter(date__in=dates)
+            if (slot.date, slot.time) in pairs
+        }
+
+
 class Exam(models.Model):
     examID = models.AutoField(primary_key=True, db_column='examID')
     name = models.CharField(max_length=255)
     date = models.DateField(null=True, blank=True)
     time = models.TimeField(null=True, blank=True)
+    slot = models.ForeignKey(ExamSlot, on_delete=models.SET_NULL, null=True, blank=True, db_column='slotID', related_name='exams')
     college = models.CharField(max_length=255)
     courseID = models.ForeignKey(Course, on_delete=models.CASCADE, db_column='courseID', related_name='exams')
 
     class Meta:
         db_table = 'exams'
 
+    def save(self, *args, **kwargs):
+        # Keep the slot in step with date/time so same-time lookups can join on it
+        if self.date and self.time:
+            self.slot, _ = ExamSlot.objects.get_or_create(date=self.date, time=self.time)
+        else:
+            self.slot = None
+        super().save(*args, **kwargs)
+
 
 class Hall(models.Model):
     hallID = models.AutoField(primary_key=True, db_column='hallID')
@@ -119,6 +157,7 @@ class Schedule(models.Model):
 class AvailabilityDay(models.Model):
     id = models.AutoField(primary_key=True)
     date = models.CharField(max_length=20)
+    availableOn = models.DateField(null=True, blank=True, db_index=True, db_column='availableOn')
     instructorID = models.ForeignKey(Instructor, on_delete=models.CASCADE, db_column='instructorID', related_name='availability_days')
     createdAt = models.DateTimeField(auto_now_add=True, db_column='createdAt')
     updatedAt = models.DateTimeField(auto_now=True, db_column='updatedAt')
@@ -126,10 +165,16 @@ class AvailabilityDay(models.Model):
     class Meta:
         db_table = 'availability_days'
 
+    def save(self, *args, **kwargs):
+        # Keep the parsed date next to the "01Jan" string the UI sends
+        self.availableOn = parse_day(self.date, self.createdAt)
+        super().save(*args, **kwargs)
+
 
 class AvailabilityTime(models.Model):
     id = models.AutoField(primary_key=True)
     time = models.CharField(max_length=20)
+    availableAt = models.TimeField(null=True, blank=True, db_index=True, db_column='availableAt')
     availabilityId = models.ForeignKey(AvailabilityDay, on_delete=models.CASCADE, db_column='availabilityId', related_name='availability_slots')
     createdAt = models.DateTimeField(auto_now_add=True, db_column='createdAt')
     updatedAt = models.DateTimeField(auto_now=True, db_column='updatedAt')
@@ -137,6 +182,10 @@ class AvailabilityTime(models.Model):
     class Meta:
         db_table = 'availability_times'
 
+    def save(self, *args, **kwargs):
+        self.availableAt = parse_time(self.time)
+        super().save(*args, **kwargs)
+
 
 class InstructorOnHall(models.Model):
     id = models.AutoField(primary_key=True)
@@ -149,3 +198,122 @@ class InstructorOnHall(models.Model):
     class Meta:
         db_table = 'instructor_on_halls'
         unique_together = ('examID', 'hallID', 'instructorID')
+
+
+class ExamSummary(models.Model):
+    """Read model behind selection_exams, refreshed by the write paths"""
+    examID = models.OneToOneField(Exam, on_delete=models.CASCADE, primary_key=True, db_column='examID', related_name='summary')
+    studentCount = models.IntegerField(default=0, db_column='studentCount')
+    withoutHalls = models.IntegerField(default=0, db_column='withoutHalls')
+    # [{'hallID', 'name', 'used', 'remaining', 'invigilators': [names]}]
+    halls = models.JSONField(default=list)
+    updatedAt = models.DateTimeField(auto_now=True, db_column='updatedAt')
+
+    class Meta:
+        db_table = 'exam_summaries'
+
+
+class HallOccupancy(models.Model):
+    """Seats taken in a hall during a slot, refreshed by the write paths"""
+    id = models.AutoField(primary_key=True)
+    hallID = models.ForeignKey(Hall, on_delete=models.CASCADE, db_column='hallID', related_name='occupancies')
+    slot = models.ForeignKey(ExamSlot, on_delete=models.CASCADE, db_column='slotID', related_name='occupancies')
+    seats = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'hall_occupancies'
+        unique_together = ('hallID', 'slot')
+
+
+class ScheduleJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    jobID = models.AutoField(primary_key=True, db_column='jobID')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    phase = models.CharField(max_length=50, default='queued')
+    progress = models.FloatField(default=0)
+    examsTotal = models.IntegerField(default=0, db_column='examsTotal')
+    examsPlaced = models.IntegerField(default=0, db_column='examsPlaced')
+    options = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    cancelRequested = models.BooleanField(default=False, db_column='cancelRequested')
+    createdAt = models.DateTimeField(auto_now_add=True, db_column='createdAt')
+    startedAt = models.DateTimeField(null=True, blank=True, db_column='startedAt')
+    heartbeatAt = models.DateTimeField(null=True, blank=True, db_column='heartbeatAt')
+    finishedAt = models.DateTimeField(null=True, blank=True, db_column='finishedAt')
+
+    class Meta:
+        db_table = 'schedule_jobs'
+
+
+class UploadJob(models.Model):
+    """A roster upload stored under MEDIA_ROOT and ingested in the background.
+
+    ``rowsProcessed``, ``counts``, ``errors`` and ``heartbeatAt`` are saved
+    with every committed batch, so a failed job resumes after its last
+    committed row.
+    """
+    KIND_CHOICES = [
+        ('students', 'Students'),
+        ('enrollments', 'Enrollments'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    jobID = models.AutoField(primary_key=True, db_column='jobID')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    file = models.FileField(upload_to='upload_jobs/')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    rowsProcessed = models.IntegerField(default=0, db_column='rowsProcessed')
+    rowsPerSecond = models.IntegerField(default=0, db_column='rowsPerSecond')
+    counts = models.JSONField(default=dict)
+    errors = models.JSONField(default=dict)
+    error = models.TextField(null=True, blank=True)
+    createdAt = models.DateTimeField(auto_now_add=True, db_column='createdAt')
+    startedAt = models.DateTimeField(null=True, blank=True, db_column='startedAt')
+    heartbeatAt = models.DateTimeField(null=True, blank=True, db_column='heartbeatAt')
+    finishedAt = models.DateTimeField(null=True, blank=True, db_column='finishedAt')
+
+    class Meta:
+        db_table = 'upload_jobs'
+
+
+class UploadLedger(models.Model):
+    """One imported upload per endpoint and file content.
+
+    ``rowHashes`` holds the fixed-size hashes of every row of the latest
+    import for the endpoint, which the next upload is diffed against;
+    older entries keep only their file hash.
+    """
+    ledgerID = models.AutoField(primary_key=True, db_column='ledgerID')
+    endpoint = models.CharField(max_length=20)
+    sha256 = models.CharField(max_length=64)
+    rows = models.IntegerField(default=0)
+    rowHashes = models.BinaryField(default=bytes, db_column='rowHashes')
+    errors = models.JSONField(default=dict)
+    importedAt = models.DateTimeField(auto_now=True, db_column='importedAt')
+
+    class Meta:
+        db_table = 'upload_ledger'
+        unique_together = ('endpoint', 'sha256')
+        indexes = [models.Index(fields=['endpoint', '-importedAt'])]
+
+
+class CacheVersion(models.Model):
+    """Version stamp of a per-process cache, bumped by every write it depends on"""
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=1)
+
+    class Meta:
+        db_table = 'cache_versions'
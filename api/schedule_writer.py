@@ -0,0 +1,67 @@
+"""Bulk persistence of scheduler output."""
+from datetime import datetime
+
+from django.db import transaction
+
+from .models import Exam, ExamSlot, Schedule
+from .summaries import refresh_occupancy, refresh_summaries
+
+CHUNK_SIZE = 2000
+
+
+def chunked(items, size=CHUNK_SIZE):
+    """Yield lists of at most ``size`` items from any iterable"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_schedule(timetable, chunk_size=CHUNK_SIZE):
+    """Save placed exams' date/time and create their missing Schedule rows.
+
+    Everything happens in one transaction: exam dates and slots go out
+    through ``bulk_update`` and only the (exam, student) pairs that do not exist
+    yet are inserted, ``chunk_size`` rows at a time. Returns the number of
+    Schedule rows created.
+    """
+    graph = timetable.graph
+    calendar = timetable.calendar
+    placed = timetable.placed()
+
+    exams = []
+    for i in placed:
+        exam = graph.exams[i]
+        exam.date = datetime.strptime(calendar.days[timetable.day_of[i]], '%Y-%m-%d').date()
+        exam.time = datetime.strptime(calendar.time_at(timetable.day_of[i], timetable.time_of[i]), '%H:%M').time()
+        exams.append(exam)
+
+    with transaction.atomic():
+        slot_ids = ExamSlot.ids_for((exam.date, exam.time) for exam in exams)
+        for exam in exams:
+            exam.slot_id = slot_ids[(exam.date, exam.time)]
+        Exam.objects.bulk_update(exams, ['date', 'time', 'slot'], batch_size=chunk_size)
+
+        existing = set()
+        for exam_ids in chunked([exam.examID for exam in exams], 500):
+            existing.update(
+                Schedule.objects.filter(examID__in=exam_ids).values_list('examID', 'studentID')
+            )
+
+        missing = (
+            Schedule(examID_id=graph.exams[i].examID, studentID_id=student_id, college=graph.exams[i].college)
+            for i in placed
+            for student_id in graph.students[i]
+            if (graph.exams[i].examID, student_id) not in existing
+        )
+        created = 0
+        for rows in chunked(missing, chunk_size):
+            Schedule.objects.bulk_create(rows, ignore_conflicts=True)
+            created += len(rows)
+        refresh_summaries(exam.examID for exam in exams)
+        refresh_occupancy(slot_ids.values())
+    return created
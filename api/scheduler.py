@@ -0,0 +1,748 @@
+"""Exam timetabling on top of the in-memory conflict graph.
+
+Nothing in this module touches the database: the views load a
+``ConflictGraph`` once, run one of the algorithms below and write the
+resulting assignment back themselves.
+"""
+import math
+import multiprocessing
+import os
+import random
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+from heapq import heapify, heappop, heappush
+from time import monotonic
+
+DEFAULT_TIMES = ('09:00', '11:00')
+MAX_COLLEGE_EXAMS_PER_DAY = 3
+# Upper bounds on the local-search budget, restarts and calendar a request may ask for
+MAX_OPTIMISE_SECONDS = 120
+MAX_RESTARTS = 32
+MAX_CALENDAR_DAYS = 120
+
+# Penalty weights used by the local search. Breaking a hard rule always
+# costs more than leaving a single exam unscheduled.
+UNPLACED_PENALTY = 1000
+CLASH_PENALTY = 5000
+SAME_DAY_PENALTY = 2000
+COLLEGE_CAP_PENALTY = 5000
+
+
+class Calendar:
+    """Ordered exam days and the sittings held on each.
+
+    Every day has the sittings in ``times`` unless ``sittings`` gives each
+    day its own list; ``times`` is then every time used on any day.
+    ``closed`` holds (day, sitting) index pairs that keep the exams already
+    there but take no new ones.
+    """
+
+    def __init__(self, days, times=DEFAULT_TIMES, sittings=None, closed=()):
+        self.days = list(days)
+        if sittings is None:
+            sittings = [tuple(times)] * len(self.days)
+        self.sittings = [tuple(day_times) for day_times in sittings]
+        self.times = tuple(sorted({time for day_times in self.sittings for time in day_times}))
+        self.closed = set(closed)
+
+    @classmethod
+    def working_days(cls, start, count=14, weekend=(4, 5), times=DEFAULT_TIMES, holidays=()):
+        """``count`` days from ``start`` skipping Friday, Saturday and ``holidays``"""
+        days = []
+        current = start
+        holidays = {str(day) for day in holidays}
+        while len(days) < count:
+            day = current.strftime('%Y-%m-%d')
+            if current.weekday() not in weekend and day not in holidays:
+                days.append(day)
+            current += timedelta(days=1)
+        return cls(days, times)
+
+    @classmethod
+    def from_slots(cls, slots, occupied=()):
+        """Calendar of exactly the given (date, time) slots.
+
+        ``occupied`` slots outside them are added closed, so exams already
+        sitting there can be placed but nothing new goes in.
+        """
+        sittings = {}
+        for date, time in slots:
+            sittings.setdefault(date.strftime('%Y-%m-%d'), set()).add(time.strftime('%H:%M'))
+        shut = set()
+        for date, time in occupied:
+            key = (date.strftime('%Y-%m-%d'), time.strftime('%H:%M'))
+            if key[1] not in sittings.get(key[0], ()):
+                shut.add(key)
+                sittings.setdefault(key[0], set()).add(key[1])
+        days = sorted(sittings)
+        day_times = [sorted(sittings[day]) for day in days]
+        closed = {
+            (d, t) for d, day in enumerate(days) for t, time in enumerate(day_times[d]) if (day, time) in shut
+        }
+        return cls(days, sittings=day_times, closed=closed)
+
+    def times_on(self, day):
+        """Sitting times of day index ``day``"""
+        return self.sittings[day]
+
+    def time_at(self, day, time):
+        return self.sittings[day][time]
+
+    def __len__(self):
+        return len(self.days)
+
+
+class Timetable:
+    """Exam -> (day, sitting) assignment with per-day bookkeeping.
+
+    A student never sits two exams on the same day and a college holds at
+    most ``MAX_COLLEGE_EXAMS_PER_DAY`` exams per day, or the share of that
+    cap given in ``caps`` as ``{(day, college): limit}``.
+    """
+
+    def __init__(self, graph, calendar, caps=None):
+        self.graph = graph
+        self.calendar = calendar
+        self.caps = caps
+        self.day_of = [None] * len(graph)
+        self.time_of = [None] * len(graph)
+        self.day_exams = [set() for _ in calendar.days]
+        self.sittings = [[[] for _ in calendar.times_on(day)] for day in range(len(calendar))]
+        self.college_count = [{} for _ in calendar.days]
+
+    def cap(self, day, college):
+        if self.caps is None:
+            return MAX_COLLEGE_EXAMS_PER_DAY
+        return self.caps.get((day, college), 0)
+
+    def next_sitting(self, day):
+        """Earliest sitting, unless it is taken and a later one is still empty.
+
+        Closed sittings are passed over; None if the day has no open one.
+        """
+        sittings = self.sittings[day]
+        if self.calendar.closed:
+            open_sittings = [t for t in range(len(sittings)) if (day, t) not in self.calendar.closed]
+            if not open_sittings:
+                return None
+            return next((t for t in open_sittings if not sittings[t]), open_sittings[0])
+        if not sittings[0]:
+            return 0
+        return next((t for t in range(1, len(sittings)) if not sittings[t]), 0)
+
+    def choose_time(self, i, day):
+        """Sitting index exam ``i`` would take on ``day``, or None if it cannot go there"""
+        college = self.graph.colleges[i]
+        if self.college_count[day].get(college, 0) >= self.cap(day, college):
+            return None
+        if self.graph.conflicts_with(i, self.day_exams[day]):
+            return None
+
+        # A later sitting must not share students with same-college exams before it
+        sittings = self.sittings[day]
+        time = self.next_sitting(day)
+        if time is None:
+            return None
+        if time > 0:
+            for earlier in sittings[:time]:
+                same_college = [j for j in earlier if self.graph.colleges[j] == college]
+                if self.graph.conflicts_with(i, same_college):
+                    return None
+        return time
+
+    def place(self, i, day, time):
+        college = self.graph.colleges[i]
+        self.day_of[i] = day
+        self.time_of[i] = time
+        self.day_exams[day].add(i)
+        self.sittings[day][time].append(i)
+        self.college_count[day][college] = self.college_count[day].get(college, 0) + 1
+
+    def unplace(self, i):
+        day = self.day_of[i]
+        if day is None:
+            return
+        college = self.graph.colleges[i]
+        self.day_exams[day].discard(i)
+        self.sittings[day][self.time_of[i]].remove(i)
+        self.college_count[day][college] -= 1
+        self.day_of[i] = None
+        self.time_of[i] = None
+
+    def placed(self):
+        return [i for i, day in enumerate(self.day_of) if day is not None]
+
+    def unplaced(self):
+        return [i for i, day in enumerate(self.day_of) if day is None]
+
+    def pair_cost(self, i, j, time_i, time_j):
+        """Penalty for exams ``i`` and ``j`` sitting on the same day"""
+        shared = self.graph.adjacency[i].get(j, 0)
+        if not shared:
+            return 0
+        if time_i == time_j or self.graph.colleges[i] == self.graph.colleges[j]:
+            return CLASH_PENALTY * shared
+        return SAME_DAY_PENALTY * shared
+
+    def cost_at(self, i, day, time):
+        """Penalty exam ``i`` contributes at (``day``, ``time``), ignoring itself"""
+        if day is None:
+            return UNPLACED_PENALTY
+        cost = 0
+        neighbours = self.graph.adjacency[i]
+        same_day = self.day_exams[day]
+        if len(same_day) < len(neighbours):
+            candidates = (j for j in same_day if j in neighbours)
+        else:
+            candidates = (j for j in neighbours if j in same_day)
+        for j in candidates:
+            if j != i:
+                cost += self.pair_cost(i, j, time, self.time_of[j])
+
+        college = self.graph.colleges[i]
+        others = self.college_count[day].get(college, 0) - (self.day_of[i] == day)
+        if others >= self.cap(day, college):
+            cost += COLLEGE_CAP_PENALTY
+        return cost
+
+    def move(self, i, day, time):
+        """Move exam ``i`` (``day`` None unplaces it) and return the penalty delta"""
+        delta = -self.cost_at(i, self.day_of[i], self.time_of[i])
+        self.unplace(i)
+        delta += self.cost_at(i, day, time)
+        if day is not None:
+            self.place(i, day, time)
+        return delta
+
+    def penalty(self):
+        """Full penalty: unplaced exams, student clashes, same-day load and college cap"""
+        total = UNPLACED_PENALTY * len(self.unplaced())
+        for day, exams in enumerate(self.day_exams):
+            for i in exams:
+                for j in self.graph.adjacency[i]:
+                    if j > i and j in exams:
+                        total += self.pair_cost(i, j, self.time_of[i], self.time_of[j])
+            for college, count in self.college_count[day].items():
+                total += COLLEGE_CAP_PENALTY * max(0, count - self.cap(day, college))
+        return total
+
+    def snapshot(self):
+        return list(self.day_of), list(self.time_of)
+
+    def same_day_neighbours(self, i):
+        day = self.day_of[i]
+        return day is not None and self.graph.conflicts_with(i, self.day_exams[day])
+
+    def restore(self, snapshot):
+        day_of, time_of = snapshot
+        for i in self.placed():
+            self.unplace(i)
+        for i, day in enumerate(day_of):
+            if day is not None:
+                self.place(i, day, time_of[i])
+
+    def assignments(self):
+        """``{examID: {'date': ..., 'time': ...}}`` for every placed exam"""
+        result = {}
+        for i in self.placed():
+            result[self.graph.exams[i].examID] = {
+                'date': self.calendar.days[self.day_of[i]],
+                'time': self.calendar.time_at(self.day_of[i], self.time_of[i]),
+            }
+        return result
+
+
+def _jitter(graph, rng):
+    """Per-exam multiplicative noise used to diversify restarts"""
+    if rng is None:
+        return [1.0] * len(graph)
+    return [rng.uniform(0.75, 1.25) for _ in range(len(graph))]
+
+
+def greedy_schedule(graph, calendar, rng=None, caps=None):
+    """First-fit: largest exams first, each on the earliest day it fits"""
+    table = Timetable(graph, calendar, caps)
+    noise = _jitter(graph, rng)
+    order = sorted(range(len(graph)), key=lambda i: graph.sizes[i] * noise[i], reverse=True)
+
+    for i in order:
+        for day in range(len(calendar)):
+            time = table.choose_time(i, day)
+            if time is not None:
+                table.place(i, day, time)
+                break
+    return table
+
+
+def dsatur_schedule(graph, calendar, rng=None, caps=None):
+    """Saturation-degree colouring of the conflict graph with days as colours.
+
+    The next exam is always the one whose neighbours already block the most
+    distinct days. The grid usually has fewer days than the graph needs
+    colours, so ties go to the exam with the fewest conflicts (then the
+    largest) to keep days open for the rest. Saturation only ever grows, so
+    stale heap entries are skipped lazily on pop.
+    """
+    table = Timetable(graph, calendar, caps)
+    blocked = [set() for _ in range(len(graph))]
+    done = [False] * len(graph)
+    noise = _jitter(graph, rng)
+    heap = [(0, graph.degree(i) * noise[i], -graph.sizes[i], i) for i in range(len(graph))]
+    heapify(heap)
+
+    while heap:
+        saturation, _, _, i = heappop(heap)
+        if done[i] or -saturation != len(blocked[i]):
+            continue
+        done[i] = True
+
+        for day in range(len(calendar)):
+            if day in blocked[i]:
+                continue
+            time = table.choose_time(i, day)
+            if time is not None:
+                table.place(i, day, time)
+                break
+        else:
+            continue
+
+        for j in graph.adjacency[i]:
+            if not done[j] and day not in blocked[j]:
+                blocked[j].add(day)
+                heappush(heap, (-len(blocked[j]), graph.degree(j) * noise[j], -graph.sizes[j], j))
+    return table
+
+
+def kempe_chain(table, i, other_day):
+    """Exams connected to ``i`` through conflicts within its day and ``other_day``"""
+    days = (table.day_of[i], other_day)
+    chain = {i}
+    stack = [i]
+    while stack:
+        current = stack.pop()
+        for j in table.graph.adjacency[current]:
+            if j not in chain and table.day_of[j] in days:
+                chain.add(j)
+                stack.append(j)
+    return chain
+
+
+def local_search(table, seconds, seed=None, progress=None, cancel=None):
+    """Simulated annealing over ``table`` for roughly ``seconds`` seconds.
+
+    Moves shift or drop a single exam, swap a Kempe chain between two days,
+    or force an unscheduled exam onto a day by dropping what it collides
+    with. Each move updates the penalty incrementally from the moved exams'
+    neighbourhoods, and the best timetable seen is restored at the end.
+    ``progress(fraction, placed)`` is called periodically if given, and the
+    search stops early once the ``cancel`` event is set.
+    """
+    rng = random.Random(seed)
+    days = len(table.calendar)
+    n = len(table.graph)
+    if not n or not days:
+        return table
+
+    score = table.penalty()
+    best_score = score
+    best = table.snapshot()
+
+    start = monotonic()
+    start_temperature = float(UNPLACED_PENALTY)
+    end_temperature = 1.0
+    temperature = start_temperature
+    iteration = 0
+
+    while True:
+        iteration += 1
+        if iteration % 256 == 0:
+            elapsed = (monotonic() - start) / seconds
+            if elapsed >= 1 or (cancel is not None and cancel.is_set()):
+                break
+            if progress is not None:
+                progress(elapsed, n - table.day_of.count(None))
+            temperature = start_temperature * (end_temperature / start_temperature) ** elapsed
+
+        i = rng.randrange(n)
+        undo = []
+        delta = 0
+        roll = rng.random()
+        if table.day_of[i] is not None and roll < 0.3:
+            other_day = rng.randrange(days)
+            if other_day == table.day_of[i]:
+                continue
+            this_day = table.day_of[i]
+            for j in kempe_chain(table, i, other_day):
+                target = other_day if table.day_of[j] == this_day else this_day
+                # Days may hold different numbers of sittings
+                time = min(table.time_of[j], len(table.calendar.times_on(target)) - 1)
+                undo.append((j, table.day_of[j], table.time_of[j]))
+                delta += table.move(j, target, time)
+        elif table.day_of[i] is None and roll < 0.6:
+            # Ejection: take a day and drop whatever it collides with there
+            day = rng.randrange(days)
+            college = table.graph.colleges[i]
+            evicted = [j for j in table.day_exams[day] if j in table.graph.adjacency[i]]
+            if table.college_count[day].get(college, 0) >= table.cap(day, college):
+                same_college = [j for j in table.day_exams[day]
+                                if table.graph.colleges[j] == college and j not in evicted]
+                if same_college:
+                    evicted.append(rng.choice(same_college))
+            for j in evicted:
+                undo.append((j, table.day_of[j], table.time_of[j]))
+                delta += table.move(j, None, None)
+            undo.append((i, None, None))
+            delta += table.move(i, day, rng.randrange(len(table.calendar.times_on(day))))
+        elif table.day_of[i] is not None and roll < 0.35:
+            undo.append((i, table.day_of[i], table.time_of[i]))
+            delta += table.move(i, None, None)
+        else:
+            day = rng.randrange(days)
+            undo.append((i, table.day_of[i], table.time_of[i]))
+            delta += table.move(i, day, rng.randrange(len(table.calendar.times_on(day))))
+
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            score += delta
+            if score < best_score:
+                best_score = score
+                best = table.snapshot()
+        else:
+            for j, day, time in reversed(undo):
+                table.move(j, day, time)
+
+    table.restore(best)
+    return table
+
+
+def _nearest_days(table, origin):
+    return sorted(range(len(table.calendar)), key=lambda d: abs(d - origin))
+
+
+def _place_nearest(table, i, origin, movable):
+    """Put exam ``i`` on the day nearest ``origin`` that takes it.
+
+    If no day does, one movable exam that alone blocks a day may be pushed
+    to another day to make room. Returns the exams moved (``i`` first) or
+    None when ``i`` could not be placed.
+    """
+    days = _nearest_days(table, origin)
+    for day in days:
+        time = table.choose_time(i, day)
+        if time is not None:
+            table.place(i, day, time)
+            return [i]
+
+    neighbours = table.graph.adjacency[i]
+    for day in days:
+        blockers = [j for j in table.day_exams[day] if j in neighbours]
+        if len(blockers) != 1 or blockers[0] not in movable:
+            continue
+        j = blockers[0]
+        j_day, j_time = table.day_of[j], table.time_of[j]
+        table.unplace(j)
+        time = table.choose_time(i, day)
+        if time is not None:
+            table.place(i, day, time)
+            for other in _nearest_days(table, j_day):
+                other_time = table.choose_time(j, other)
+                if other_time is not None:
+                    table.place(j, other, other_time)
+                    return [i, j]
+            table.unplace(i)
+        table.place(j, j_day, j_time)
+    return None
+
+
+def repair_schedule(table, changed, movable):
+    """Move as few exams as possible to clear clashes involving ``changed``.
+
+    Clashing exams are evicted greedily, the one in the most clashes first,
+    preferring exams from ``changed`` and then smaller ones, until no clash
+    is left. Each evicted exam then goes to the nearest day that takes it.
+    Only exams in ``movable`` are ever moved. Returns the moved exams and
+    those whose clashes could not be cleared.
+    """
+    graph = table.graph
+    clashes = {}
+    for i in changed:
+        day = table.day_of[i]
+        if day is None:
+            continue
+        for j in graph.adjacency[i]:
+            if table.day_of[j] == day:
+                clashes.setdefault(i, set()).add(j)
+                clashes.setdefault(j, set()).add(i)
+
+    evicted = []
+    while True:
+        candidates = [i for i in clashes if i in movable]
+        if not candidates:
+            break
+        i = max(candidates, key=lambda i: (len(clashes[i]), i in changed, -graph.sizes[i]))
+        for j in clashes.pop(i):
+            clashes[j].discard(i)
+            if not clashes[j]:
+                del clashes[j]
+        evicted.append(i)
+    unresolved = set(clashes)
+
+    # One at a time, so nothing moves into a day an exam may have to return to
+    origins = {i: (table.day_of[i], table.time_of[i]) for i in table.placed()}
+    for i in sorted(evicted, key=lambda i: graph.sizes[i], reverse=True):
+        table.unplace(i)
+        if _place_nearest(table, i, origins[i][0], movable) is None:
+            table.place(i, *origins[i])
+            unresolved.add(i)
+
+    moved = [i for i, origin in origins.items() if (table.day_of[i], table.time_of[i]) != origin]
+    return moved, sorted(unresolved)
+
+
+def evaluate(table):
+    """Quality metrics for a timetable, computed without touching the database"""
+    graph = table.graph
+    calendar = table.calendar
+    per_day = Counter()
+    per_sitting = Counter()
+    slots = [[{'exams': 0, 'students': 0} for _ in calendar.times_on(day)] for day in range(len(calendar))]
+
+    for i in table.placed():
+        day, time = table.day_of[i], table.time_of[i]
+        slots[day][time]['exams'] += 1
+        slots[day][time]['students'] += graph.sizes[i]
+        for student_id in graph.students[i]:
+            per_day[(student_id, day)] += 1
+            per_sitting[(student_id, day, time)] += 1
+
+    exams_per_day = Counter(per_day.values())
+    used = sum(1 for day in slots for slot in day if slot['exams'])
+    return {
+        'examsPlaced': len(table.placed()),
+        'unplacedExams': [graph.exams[i].examID for i in table.unplaced()],
+        'clashes': sum(1 for count in per_sitting.values() if count > 1),
+        'maxExamsPerDay': max(per_day.values(), default=0),
+        'studentDaysByExamCount': dict(sorted(exams_per_day.items())),
+        'slotUtilisation': {
+            'used': used,
+            'total': sum(len(day) for day in slots),
+            'slots': [
+                {'date': calendar.days[day], 'time': calendar.time_at(day, t), **slot}
+                for day, sittings in enumerate(slots)
+                for t, slot in enumerate(sittings)
+            ],
+        },
+        'penalty': table.penalty(),
+    }
+
+
+ALGORITHMS = {
+    'greedy': greedy_schedule,
+    'dsatur': dsatur_schedule,
+}
+
+
+def _start(graph, calendar, algorithm, seed, optimise_seconds, progress=None, cancel=None):
+    """One run for ``multi_start``; seed 0 is the plain deterministic order"""
+    rng = random.Random(seed) if seed else None
+    table = ALGORITHMS[algorithm](graph, calendar, rng)
+    if optimise_seconds > 0:
+        local_search(table, optimise_seconds, seed=seed, progress=progress, cancel=cancel)
+    return table.penalty(), seed, table.snapshot()
+
+
+# Read-only inputs of a pool worker process, set once by ``_init_worker``.
+# Workers never fork from the parent, so nothing here is shared with it.
+_worker = {}
+
+
+def _init_worker(graph, calendar, cancel):
+    _worker['graph'] = graph
+    _worker['calendar'] = calendar
+    _worker['cancel'] = cancel
+
+
+def _single_start(algorithm, seed, optimise_seconds):
+    return _start(_worker['graph'], _worker['calendar'], algorithm, seed, optimise_seconds, cancel=_worker['cancel'])
+
+
+def _pool(graph, calendar, workers):
+    """Process pool whose workers receive ``graph`` and ``calendar`` once each.
+
+    Workers come from a forkserver (or spawn) rather than a fork of this
+    process, which may be a threaded server. Returns the pool and an event
+    that stops the workers' local search when set.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    cancel = context.Event()
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(graph, calendar, cancel)
+    )
+    return pool, cancel
+
+
+def _release(pool):
+    """Shut ``pool`` down without waiting on runs still busy after a cancel.
+
+    A background join keeps the pool, and so the shared cancel event, alive
+    until its last worker has exited: a worker still starting up would
+    otherwise find the event's semaphore gone.
+    """
+    pool.shutdown(wait=False, cancel_futures=True)
+    threading.Thread(target=pool.shutdown, daemon=True).start()
+
+
+def _gather(futures, cancel, progress=None, interval=0.5):
+    """Results of ``futures`` in order, reporting progress every ``interval`` seconds.
+
+    ``placed`` is the most exams any finished run has placed. If ``progress``
+    raises, for instance because the job was cancelled, the workers are told
+    to stop before re-raising.
+    """
+    try:
+        done = 0
+        placed = 0
+        pending = set(futures)
+        while pending:
+            finished, pending = wait(pending, timeout=interval, return_when=FIRST_COMPLETED)
+            for future in finished:
+                _, _, (day_of, _) = future.result()
+                done += 1
+                placed = max(placed, len(day_of) - day_of.count(None))
+            if progress is not None:
+                progress(done / len(futures), placed)
+    except BaseException:
+        cancel.set()
+        raise
+    return [future.result() for future in futures]
+
+
+def multi_start(graph, calendar, algorithm='greedy', restarts=1, optimise_seconds=0, workers=None, progress=None):
+    """Run ``restarts`` differently-ordered schedules in parallel and keep the best.
+
+    ``progress(fraction, placed)`` is called as the search advances.
+    """
+    if restarts <= 1:
+        results = [_start(graph, calendar, algorithm, 0, optimise_seconds, progress)]
+    else:
+        workers = workers or min(restarts, os.cpu_count() or 1)
+        pool, cancel = _pool(graph, calendar, workers)
+        try:
+            futures = [
+                pool.submit(_single_start, algorithm, seed, optimise_seconds)
+                for seed in range(restarts)
+            ]
+            results = _gather(futures, cancel, progress)
+        finally:
+            _release(pool)
+
+    _, _, best = min(results)
+    table = Timetable(graph, calendar)
+    table.restore(best)
+    return table
+
+
+def pack_components(graph, bins):
+    """Spread connected components over ``bins`` groups of similar size"""
+    groups = [[] for _ in range(bins)]
+    for component in graph.components():
+        min(groups, key=len).extend(component)
+    return [sorted(group) for group in groups if group]
+
+
+def share_college_caps(graph, calendar, groups):
+    """Split every college's daily cap between groups in proportion to their exams"""
+    caps = [{} for _ in groups]
+    for college in set(graph.colleges):
+        demand = [sum(1 for i in group if graph.colleges[i] == college) for group in groups]
+        takers = [g for g, wanted in enumerate(demand) if wanted]
+        given = [0] * len(groups)
+        for day in range(len(calendar)):
+            for _ in range(MAX_COLLEGE_EXAMS_PER_DAY):
+                g = max(takers, key=lambda g: (demand[g] - given[g]) / demand[g])
+                given[g] += 1
+                caps[g][(day, college)] = caps[g].get((day, college), 0) + 1
+    return caps
+
+
+def _solve_group(indices, caps, algorithm, seed, optimise_seconds):
+    """One group of components for ``solve_components``, in a pool worker"""
+    graph = _worker['graph'].subgraph(indices)
+    rng = random.Random(seed) if seed else None
+    table = ALGORITHMS[algorithm](graph, _worker['calendar'], rng, caps)
+    if optimise_seconds > 0:
+        local_search(table, optimise_seconds, seed=seed, cancel=_worker['cancel'])
+    return table.penalty(), seed, table.snapshot()
+
+
+def merge_groups(graph, calendar, groups, snapshots):
+    """Combine per-group timetables into one, settling the shared resources.
+
+    Groups share no students, so their days combine freely. Sittings are
+    shared per day, so they are handed out again across groups, except for
+    exams that sit next to a same-day neighbour and must keep their group's
+    sitting. Finally, any exam still unplaced may use capacity other groups
+    left unused.
+    """
+    table = Timetable(graph, calendar)
+    placements = []
+    for indices, (day_of, time_of) in zip(groups, snapshots):
+        local = Timetable(graph.subgraph(indices), calendar)
+        local.restore((day_of, time_of))
+        for k, i in enumerate(indices):
+            if day_of[k] is not None:
+                placements.append((i, day_of[k], time_of[k], local.same_day_neighbours(k)))
+
+    placements.sort(key=lambda p: graph.sizes[p[0]], reverse=True)
+    for i, day, time, pinned in placements:
+        table.place(i, day, time if pinned else table.next_sitting(day))
+
+    for i in sorted(table.unplaced(), key=lambda i: graph.sizes[i], reverse=True):
+        for day in range(len(calendar)):
+            time = table.choose_time(i, day)
+            if time is not None:
+                table.place(i, day, time)
+                break
+    return table
+
+
+def solve_components(graph, calendar, algorithm='greedy', restarts=1, optimise_seconds=0, workers=None,
+                     progress=None):
+    """Schedule independent parts of the conflict graph concurrently.
+
+    Connected components are packed into one group per worker. The college
+    cap is the only rule that couples groups, so each group gets a fixed
+    share of it; every (group, restart) pair is then solved in the pool and
+    the best run per group goes into ``merge_groups``.
+    """
+    workers = workers or os.cpu_count() or 1
+    groups = pack_components(graph, workers)
+    if not groups:
+        return Timetable(graph, calendar)
+    caps = share_college_caps(graph, calendar, groups)
+
+    tasks = [(g, seed) for g in range(len(groups)) for seed in range(max(1, restarts))]
+
+    # Per-group counts say nothing about the merged total
+    def report(fraction, placed):
+        if progress is not None:
+            progress(fraction, None)
+
+    pool, cancel = _pool(graph, calendar, min(workers, len(tasks)))
+    try:
+        futures = [
+            pool.submit(_solve_group, groups[g], caps[g], algorithm, seed, optimise_seconds)
+            for g, seed in tasks
+        ]
+        results = _gather(futures, cancel, report)
+    finally:
+        _release(pool)
+
+    best = {}
+    for (g, _), result in zip(tasks, results):
+        if g not in best or result < best[g]:
+            best[g] = result
+
+    return merge_groups(graph, calendar, groups, [best[g][2] for g in range(len(groups))])
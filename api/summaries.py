@@ -0,0 +1,142 @@
+"""Maintenance of the ExamSummary and HallOccupancy read models.
+
+Write paths in the views refresh what they touch. Hall and Instructor edits
+and Student, Hall, Instructor and Exam deletes (whose cascades remove
+schedule rows and duties) can come from anywhere, so signals below cover
+them.
+"""
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Exam, ExamSummary, Hall, HallOccupancy, Instructor, InstructorOnHall, Schedule, Student
+
+CHUNK_SIZE = 500
+
+
+def refresh_summaries(exam_ids):
+    """Recompute the summaries of ``exam_ids`` from their schedule rows.
+
+    Runs three grouped queries per chunk of exams and upserts the results,
+    so write paths can call it inside their own transaction.
+    """
+    exam_ids = sorted(set(exam_ids))
+    for start in range(0, len(exam_ids), CHUNK_SIZE):
+        ExamSummary.objects.bulk_create(
+            _build(exam_ids[start:start + CHUNK_SIZE]),
+            update_conflicts=True,
+            unique_fields=['examID'],
+            update_fields=['studentCount', 'withoutHalls', 'halls', 'updatedAt'],
+        )
+
+
+def build_summaries(exam_ids):
+    """Unsaved summaries of ``exam_ids``, for readers that must not write"""
+    exam_ids = sorted(set(exam_ids))
+    summaries = []
+    for start in range(0, len(exam_ids), CHUNK_SIZE):
+        summaries.extend(_build(exam_ids[start:start + CHUNK_SIZE]))
+    return summaries
+
+
+def _build(exam_ids):
+    used = {exam_id: {} for exam_id in exam_ids}
+    for row in Schedule.objects.filter(examID__in=exam_ids).values('examID', 'hallID').annotate(
+        students=Count('scheduleID')
+    ):
+        used[row['examID']][row['hallID']] = row['students']
+
+    hall_ids = {hall_id for halls in used.values() for hall_id in halls if hall_id is not None}
+    halls = {
+        hall_id: (name, capacity)
+        for hall_id, name, capacity in Hall.objects.filter(hallID__in=hall_ids).values_list('hallID', 'name', 'capacity')
+    }
+
+    invigilators = {}
+    for exam_id, hall_id, name in InstructorOnHall.objects.filter(examID__in=exam_ids).values_list(
+        'examID', 'hallID', 'instructorID__name'
+    ).distinct().order_by('examID', 'hallID', 'instructorID'):
+        invigilators.setdefault((exam_id, hall_id), []).append(name)
+
+    summaries = []
+    for exam_id, counts in used.items():
+        hall_rows = []
+        for hall_id in sorted(hall_id for hall_id in counts if hall_id is not None):
+            name, capacity = halls[hall_id]
+            hall_rows.append({
+                'hallID': hall_id,
+                'name': name,
+                'used': counts[hall_id],
+                'remaining': capacity - counts[hall_id],
+                'invigilators': invigilators.get((exam_id, hall_id), []),
+            })
+        summaries.append(ExamSummary(
+            examID_id=exam_id,
+            studentCount=sum(counts.values()),
+            withoutHalls=counts.get(None, 0),
+            halls=hall_rows,
+        ))
+    return summaries
+
+
+def refresh_occupancy(slot_ids):
+    """Recount the seats taken in every hall during ``slot_ids``"""
+    slot_ids = {slot_id for slot_id in slot_ids if slot_id}
+    if not slot_ids:
+        return
+    seats = Schedule.objects.filter(
+        examID__slot__in=slot_ids, hallID__isnull=False
+    ).values_list('examID__slot', 'hallID').annotate(seats=Count('scheduleID'))
+    with transaction.atomic():
+        HallOccupancy.objects.filter(slot__in=slot_ids).delete()
+        HallOccupancy.objects.bulk_create([
+            HallOccupancy(slot_id=slot_id, hallID_id=hall_id, seats=count)
+            for slot_id, hall_id, count in seats
+        ])
+
+
+@receiver(post_save, sender=Hall)
+def hall_saved(sender, instance, created, **kwargs):
+    # Summaries copy the hall's name and remaining seats
+    if not created:
+        refresh_summaries(Schedule.objects.filter(hallID=instance).values_list('examID', flat=True).distinct())
+
+
+@receiver(post_save, sender=Instructor)
+def instructor_saved(sender, instance, created, **kwargs):
+    # Summaries copy invigilator names
+    if not created:
+        refresh_summaries(instance.instructor_on_halls.values_list('examID', flat=True).distinct())
+
+
+@receiver(pre_delete, sender=Student)
+@receiver(pre_delete, sender=Hall)
+@receiver(pre_delete, sender=Instructor)
+def _note_cascade(sender, instance, **kwargs):
+    """Remember the exams and slots whose schedule rows or duties the delete's cascade removes"""
+    touched = set()
+    if sender is not Instructor:
+        owner = 'studentID' if sender is Student else 'hallID'
+        touched.update(Schedule.objects.filter(**{owner: instance}).values_list('examID', 'examID__slot').distinct())
+    if sender is not Student:
+        touched.update(instance.instructor_on_halls.values_list('examID', 'examID__slot').distinct())
+    instance._cascade = touched
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Hall)
+@receiver(post_delete, sender=Instructor)
+def _refresh_cascade(sender, instance, **kwargs):
+    touched = getattr(instance, '_cascade', ())
+    refresh_summaries(exam_id for exam_id, _ in touched)
+    if sender is not Instructor:
+        # Seats freed by the removed schedule rows
+        refresh_occupancy(slot_id for _, slot_id in touched)
+
+
+@receiver(post_delete, sender=Exam)
+def exam_deleted(sender, instance, **kwargs):
+    # Sent after the cascade removed the exam's schedule rows and summary,
+    # whether the exam or its course was deleted; free its seats
+    refresh_occupancy([instance.slot_id])
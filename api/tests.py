@@ -1,3 +1,807 @@
-from django.test import TestCase
+import io
+import random
+from array import array
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+from tempfile import TemporaryDirectory
+from time import monotonic
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import availability_index, cache_versions, coenrolment, jobs
+from .availability import parse_day
+from .conflict_graph import ConflictGraph
+from .hall_packing import pack_halls
+from .ingest import detect_format, ingest_students, iter_rows
+from .invigilation import assign_invigilators
+from .summaries import refresh_occupancy, refresh_summaries
+from .jobs import JobCancelled
+from .models import (
+    AvailabilityDay, AvailabilityTime, Course, Enrollment, Exam, ExamSlot, ExamSummary, Hall, HallOccupancy,
+    Instructor, InstructorOnHall, Schedule, ScheduleJob, Student, UploadJob
+)
+from .scheduler import (
+    MAX_COLLEGE_EXAMS_PER_DAY, Calendar, dsatur_schedule, greedy_schedule, local_search, multi_start,
+    repair_schedule, solve_components
+)
+
+
+def make_graph(seed, exams=60, students=400, per_student=4, colleges=3):
+    """Random conflict graph: every student takes ``per_student`` of ``exams`` courses"""
+    rng = random.Random(seed)
+    rows = [
+        SimpleNamespace(examID=i + 1, courseID_id=i + 1, college=f'C{i % colleges}')
+        for i in range(exams)
+    ]
+    student_ids = []
+    course_ids = []
+    for student_id in range(students):
+        for course_id in rng.sample(range(1, exams + 1), per_student):
+            student_ids.append(student_id)
+            course_ids.append(course_id)
+    return ConflictGraph(rows, student_ids, course_ids)
+
+
+def make_calendar(days=12, times=('09:00', '11:00')):
+    return Calendar([f'2027-01-{day:02d}' for day in range(1, days + 1)], times)
+
+
+class TimetableAssertions:
+    def assertFeasible(self, table):
+        """No student sits two exams on one day and no college exceeds its daily cap"""
+        graph = table.graph
+        per_student_day = Counter()
+        per_college_day = Counter()
+        for i in table.placed():
+            day = table.day_of[i]
+            per_college_day[(graph.colleges[i], day)] += 1
+            for student_id in graph.students[i]:
+                per_student_day[(student_id, day)] += 1
+        self.assertLessEqual(max(per_student_day.values(), default=0), 1)
+        self.assertLessEqual(max(per_college_day.values(), default=0), MAX_COLLEGE_EXAMS_PER_DAY)
+
+
+class ConstructiveSchedulerTests(TimetableAssertions, SimpleTestCase):
+    def test_timetables_are_feasible(self):
+        calendar = make_calendar()
+        for seed in range(5):
+            graph = make_graph(seed)
+            for schedule in (greedy_schedule, dsatur_schedule):
+                with self.subTest(seed=seed, algorithm=schedule.__name__):
+                    self.assertFeasible(schedule(graph, calendar))
+                    self.assertFeasible(schedule(graph, calendar, random.Random(seed)))
+
+    def test_everything_fits_a_roomy_calendar(self):
+        graph = make_graph(0, exams=20, students=100, per_student=2)
+        for schedule in (greedy_schedule, dsatur_schedule):
+            self.assertEqual(schedule(graph, make_calendar(days=30)).unplaced(), [])
+
+    def test_dsatur_places_more_than_greedy_and_high_degree_ties(self):
+        # Too few days for every exam: breaking saturation ties towards the
+        # fewest conflicts keeps days open, where the textbook most-conflicts
+        # order does worse than plain first-fit.
+        calendar = make_calendar()
+        greedy = dsatur = textbook = 0
+        for seed in range(20):
+            graph = make_graph(seed)
+            flipped = graph.subgraph(range(len(graph)))
+            flipped.degree = lambda i, adjacency=flipped.adjacency: -len(adjacency[i])
+            greedy += len(greedy_schedule(graph, calendar).placed())
+            dsatur += len(dsatur_schedule(graph, calendar).placed())
+            textbook += len(dsatur_schedule(flipped, calendar).placed())
+        self.assertGreaterEqual(dsatur, greedy * 1.05)
+        self.assertGreater(dsatur, textbook)
+
+
+class LocalSearchTests(TimetableAssertions, SimpleTestCase):
+    def test_never_ends_worse_than_it_started(self):
+        calendar = make_calendar()
+        for seed in range(3):
+            table = greedy_schedule(make_graph(seed), calendar)
+            before = table.penalty()
+            local_search(table, 0.2, seed=seed)
+            self.assertLessEqual(table.penalty(), before)
+            self.assertFeasible(table)
+
+
+class ScheduleOptionTests(TestCase):
+    def test_optimise_budget_is_bounded(self):
+        client = APIClient()
+        for value in ('inf', 'nan', '-1', '1e9', 'soon'):
+            with self.subTest(optimise=value):
+                response = client.post('/api/exam/schedule-exams', {'optimise': value}, format='json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_restarts_are_bounded(self):
+        client = APIClient()
+        for value in ('0', '-2', '33', '1e3', 'many'):
+            with self.subTest(restarts=value):
+                response = client.post('/api/exam/schedule-exams', {'restarts': value}, format='json')
+                self.assertEqual(response.status_code, 400)
+
+
+class ParallelSchedulingTests(TimetableAssertions, SimpleTestCase):
+    def test_concurrent_runs_keep_their_own_graph(self):
+        calendar = make_calendar()
+        graphs = [make_graph(seed, exams=exams) for seed, exams in ((1, 30), (2, 60), (3, 45), (4, 15))]
+
+        def run(graph):
+            return graph, multi_start(graph, calendar, optimise_seconds=0.1)
+
+        with ThreadPoolExecutor(max_workers=len(graphs)) as threads:
+            for graph, table in threads.map(run, graphs):
+                self.assertIs(table.graph, graph)
+                self.assertFeasible(table)
+
+    def test_pool_restarts_and_components(self):
+        calendar = make_calendar()
+        graph = make_graph(5)
+        single = multi_start(graph, calendar)
+        best = multi_start(graph, calendar, restarts=3, workers=2)
+        self.assertFeasible(best)
+        self.assertLessEqual(best.penalty(), single.penalty())
+        self.assertFeasible(solve_components(graph, calendar, restarts=2, workers=2))
+
+
+class ScheduleJobTests(TestCase):
+    def test_cancel_stops_running_restarts(self):
+        def cancelled(fraction, placed):
+            raise JobCancelled()
+
+        started = monotonic()
+        with self.assertRaises(JobCancelled):
+            multi_start(make_graph(6), make_calendar(), restarts=2, optimise_seconds=30, workers=2, progress=cancelled)
+        self.assertLess(monotonic() - started, 10)
+
+    def test_silent_running_job_is_failed_when_polled(self):
+        job = ScheduleJob.objects.create(
+            status='running', startedAt=timezone.now() - timedelta(hours=1),
+            heartbeatAt=timezone.now() - timedelta(hours=1),
+        )
+        live = ScheduleJob.objects.create(status='running', startedAt=timezone.now(), heartbeatAt=timezone.now())
+        response = APIClient().get(f'/api/exam/schedule-jobs/{job.jobID}')
+        self.assertEqual(response.data['status'], 'failed')
+        self.assertEqual(ScheduleJob.objects.get(jobID=live.jobID).status, 'running')
+
+    def test_queued_job_lost_in_a_restart_is_resubmitted_once(self):
+        hour_ago = timezone.now() - timedelta(hours=1)
+        lost = ScheduleJob.objects.create()
+        ScheduleJob.objects.filter(jobID=lost.jobID).update(createdAt=hour_ago)
+        ScheduleJob.objects.create()
+        client = APIClient()
+        with self.captureOnCommitCallbacks() as submitted:
+            client.get(f'/api/exam/schedule-jobs/{lost.jobID}')
+        self.assertEqual(len(submitted), 1)
+        self.assertEqual(ScheduleJob.objects.get(jobID=lost.jobID).status, 'queued')
+        # The resubmission restamped the job, so the next poll leaves it to its worker
+        with self.captureOnCommitCallbacks() as submitted:
+            client.get(f'/api/exam/schedule-jobs/{lost.jobID}')
+        self.assertEqual(submitted, [])
+
+
+class CalendarTests(TimetableAssertions, SimpleTestCase):
+    def test_from_slots_keeps_each_days_own_sittings(self):
+        calendar = Calendar.from_slots([
+            (date(2027, 1, 3), time(9)), (date(2027, 1, 3), time(11)),
+            (date(2027, 1, 4), time(13)), (date(2027, 1, 6), time(9)),
+        ])
+        self.assertEqual(calendar.days, ['2027-01-03', '2027-01-04', '2027-01-06'])
+        self.assertEqual(calendar.sittings, [('09:00', '11:00'), ('13:00',), ('09:00',)])
+
+    def test_timetables_only_use_existing_slots(self):
+        slots = [(date(2027, 1, day), time(9 + 2 * (day % 3))) for day in range(1, 15)]
+        slots += [(date(2027, 1, day), time(15)) for day in range(1, 15, 4)]
+        calendar = Calendar.from_slots(slots)
+        allowed = {(day.isoformat(), moment.strftime('%H:%M')) for day, moment in slots}
+        graph = make_graph(7)
+        for table in (greedy_schedule(graph, calendar), local_search(dsatur_schedule(graph, calendar), 0.2, seed=1)):
+            self.assertFeasible(table)
+            for placed in table.assignments().values():
+                self.assertIn((placed['date'], placed['time']), allowed)
+
+
+class ExamSlotTests(TestCase):
+    def test_generated_calendar_is_bounded(self):
+        client = APIClient()
+        for data in ({'days': 100000}, {'days': 0}, {'weekend': list(range(7))}, {'weekend': [9]}):
+            with self.subTest(**data):
+                response = client.post('/api/exam/slots', {'startDate': '2027-01-02', **data}, format='json')
+                self.assertEqual(response.status_code, 400)
+        response = client.post('/api/exam/slots', {'startDate': '2027-01-02', 'days': 3}, format='json')
+        self.assertEqual(response.data['slots'], 6)
+
+
+class RepairTests(TimetableAssertions, SimpleTestCase):
+    def enrol_late(self, table, a, b, student_id=10 ** 6):
+        """A new student takes exams ``a`` and ``b``, which now clash"""
+        graph = table.graph
+        graph.adjacency[a][b] = graph.adjacency[b][a] = graph.adjacency[a].get(b, 0) + 1
+        graph.students[a].append(student_id)
+        graph.students[b].append(student_id)
+
+    def same_day_pair(self, table):
+        for day in range(len(table.calendar)):
+            exams = sorted(table.day_exams[day])
+            if len(exams) >= 2:
+                return exams[0], exams[1]
+
+    def test_only_the_clashing_exams_move(self):
+        table = greedy_schedule(make_graph(8, exams=30, students=100, per_student=2), make_calendar(days=20))
+        a, b = self.same_day_pair(table)
+        before = {i: (table.day_of[i], table.time_of[i]) for i in table.placed()}
+        self.enrol_late(table, a, b)
+
+        moved, unresolved = repair_schedule(table, {a}, set(range(len(table.graph))))
+        self.assertEqual(unresolved, [])
+        self.assertFeasible(table)
+        self.assertEqual(len(set(moved) & {a, b}), 1)
+        self.assertLessEqual(len(moved), 2)
+        for i, position in before.items():
+            if i not in moved:
+                self.assertEqual((table.day_of[i], table.time_of[i]), position)
+
+    def test_pinned_exams_stay_put(self):
+        table = greedy_schedule(make_graph(8, exams=30, students=100, per_student=2), make_calendar(days=20))
+        a, b = self.same_day_pair(table)
+        self.enrol_late(table, a, b)
+        origin = (table.day_of[a], table.time_of[a])
+
+        moved, unresolved = repair_schedule(table, {a}, set(range(len(table.graph))) - {a})
+        self.assertEqual((table.day_of[a], table.time_of[a]), origin)
+        self.assertIn(b, moved)
+        self.assertFeasible(table)
+
+
+class HallPackingTests(SimpleTestCase):
+    def test_packing_stays_within_capacity(self):
+        rng = random.Random(9)
+        for _ in range(20):
+            capacities = {hall: rng.randint(10, 120) for hall in range(1, rng.randint(2, 12))}
+            demands = {exam: rng.randint(0, 150) for exam in range(1, rng.randint(2, 15))}
+            assignments, unassigned = pack_halls(demands, capacities)
+
+            used = Counter()
+            for exam, chosen in assignments.items():
+                self.assertEqual(len({hall for hall, _ in chosen}), len(chosen))
+                for hall, students in chosen:
+                    self.assertGreater(students, 0)
+                    used[hall] += students
+            for hall, seats in used.items():
+                self.assertLessEqual(seats, capacities[hall])
+            for exam, demand in demands.items():
+                seated = sum(students for _, students in assignments.get(exam, ()))
+                self.assertEqual(seated + unassigned.get(exam, 0), demand)
+            if unassigned:
+                # Students are only left over once every hall is full
+                self.assertEqual(sum(used.values()), sum(capacities.values()))
+
+    def test_an_exam_that_fits_one_hall_uses_the_tightest(self):
+        assignments, unassigned = pack_halls({1: 40}, {1: 100, 2: 45, 3: 30})
+        self.assertEqual(assignments, {1: [(2, 40)]})
+        self.assertEqual(unassigned, {})
+
+
+class InvigilationTests(SimpleTestCase):
+    def test_assignments_respect_availability_and_balance_load(self):
+        rng = random.Random(10)
+        instructors = list(range(1, 13))
+        available = {slot: set(rng.sample(instructors, 7)) for slot in range(6)}
+        demand = {(slot, hall): rng.randint(1, 2) for slot in range(6) for hall in range(3)}
+        assignments, shortfall = assign_invigilators(demand, available, {})
+
+        per_slot = Counter((slot, instructor) for slot, _, instructor in assignments)
+        filled = Counter((slot, hall) for slot, hall, _ in assignments)
+        load = Counter(instructor for _, _, instructor in assignments)
+        self.assertLessEqual(max(per_slot.values()), 1)
+        for slot, _, instructor in assignments:
+            self.assertIn(instructor, available[slot])
+        for key, needed in demand.items():
+            self.assertEqual(filled[key] + shortfall.get(key, 0), needed)
+        # Availability overlaps heavily here, so balancing evens the load out
+        busiest = max(load.values())
+        for instructor in instructors:
+            if any(instructor in free for free in available.values()):
+                self.assertGreaterEqual(load[instructor], busiest - 2)
+
+    def test_shortfall_when_nobody_is_free(self):
+        assignments, shortfall = assign_invigilators({('s', 'h'): 2}, {'s': {1}}, {})
+        self.assertEqual(assignments, [('s', 'h', 1)])
+        self.assertEqual(shortfall, {('s', 'h'): 1})
+
+
+class CoEnrolmentCacheTests(TestCase):
+    def setUp(self):
+        # Rolled-back tests leave stamps behind that the local matrix may still carry
+        coenrolment._matrix = None
+        self.courses = [Course.objects.create(courseName=f'C{k}', college='X') for k in range(3)]
+        self.students = [Student.objects.create(studentID=k, name=f'S{k}', email='') for k in range(1, 4)]
+
+    def test_signals_patch_the_local_matrix(self):
+        matrix = coenrolment.get_matrix()
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=self.students[0], course=self.courses[0])
+            Enrollment.objects.create(student=self.students[0], course=self.courses[1])
+        self.assertIs(coenrolment.get_matrix(), matrix)
+        self.assertEqual(matrix.shared(self.courses[0].courseID, self.courses[1].courseID), 1)
+
+    def test_a_bump_from_another_process_forces_a_rebuild(self):
+        matrix = coenrolment.get_matrix()
+        # What another worker's bulk write leaves behind: new rows and a new stamp, no signals
+        Enrollment.objects.bulk_create([
+            Enrollment(student=self.students[1], course=self.courses[0]),
+            Enrollment(student=self.students[1], course=self.courses[2]),
+        ])
+        cache_versions.bump(coenrolment.VERSION_KEY)
+        rebuilt = coenrolment.get_matrix()
+        self.assertIsNot(rebuilt, matrix)
+        self.assertEqual(rebuilt.shared(self.courses[0].courseID, self.courses[2].courseID), 1)
+
+    def test_reading_enrolments_waits_for_a_patch_in_progress(self):
+        matrix = coenrolment.get_matrix()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            with coenrolment._lock:
+                # What an on_commit patch from another request holds while it edits the matrix
+                read = pool.submit(matrix.enrolments)
+                with self.assertRaises(TimeoutError):
+                    read.result(timeout=0.2)
+            self.assertEqual(read.result(timeout=5), (array('q'), array('q')))
+
+
+class ConflictExamTests(TestCase):
+    def test_lists_students_with_two_exams_in_one_slot(self):
+        for k in range(1, 4):
+            Student.objects.create(studentID=k, name=f'S{k}', email='')
+        exams = []
+        for k, (day, hour) in enumerate([(3, 9), (3, 9), (3, 11), (4, 9)]):
+            course = Course.objects.create(courseName=f'C{k}', college='X')
+            exams.append(Exam.objects.create(
+                name=f'E{k}', college='X', courseID=course, date=date(2027, 1, day), time=time(hour)
+            ))
+        sittings = {1: [0, 1, 2], 2: [0, 3], 3: [1, 2]}
+        for student_id, taken in sittings.items():
+            for k in taken:
+                Schedule.objects.create(examID=exams[k], studentID_id=student_id, college='X')
+
+        response = APIClient().get('/api/exam/conflict-exams')
+        clashes = {row['examID']: row['student'] for row in response.data}
+        self.assertEqual(clashes, {exams[0].examID: '1', exams[1].examID: '1'})
+
+
+class ExamSummaryTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(courseName='Maths', college='X')
+        self.exam = Exam.objects.create(name='Maths', college='X', courseID=course, date=date(2027, 1, 3), time=time(9))
+        self.hall = Hall.objects.create(name='A', capacity=10)
+        self.instructor = Instructor.objects.create(name='Old', email='old@x.io')
+        self.students = [Student.objects.create(studentID=k, name=f'S{k}', email='') for k in range(1, 4)]
+        for student in self.students:
+            Schedule.objects.create(examID=self.exam, studentID=student, hallID=self.hall, college='X')
+        InstructorOnHall.objects.create(examID=self.exam, hallID=self.hall, instructorID=self.instructor)
+        refresh_summaries([self.exam.examID])
+
+    def summary(self):
+        return ExamSummary.objects.get(examID=self.exam)
+
+    def test_hall_and_instructor_edits_reach_the_summary(self):
+        self.hall.name = 'B'
+        self.hall.capacity = 20
+        self.hall.save()
+        self.instructor.name = 'New'
+        self.instructor.save()
+        hall = self.summary().halls[0]
+        self.assertEqual((hall['name'], hall['remaining'], hall['invigilators']), ('B', 17, ['New']))
+
+    def test_cascading_deletes_reach_the_summary(self):
+        self.students[0].delete()
+        self.assertEqual(self.summary().studentCount, 2)
+        self.instructor.delete()
+        self.assertEqual(self.summary().halls[0]['invigilators'], [])
+        self.hall.delete()
+        self.assertEqual((self.summary().studentCount, self.summary().halls), (0, []))
+
+    def test_automatic_scheduling_writes_summaries(self):
+        coenrolment._matrix = None
+        course = Course.objects.create(courseName='Physics', college='X')
+        exam = Exam.objects.create(name='Physics', college='X', courseID=course)
+        with self.captureOnCommitCallbacks(execute=True):
+            for student in self.students:
+                Enrollment.objects.create(student=student, course=course)
+        response = APIClient().post('/api/exam/schedule-exams', {}, format='json')
+        self.assertIn(exam.examID, response.data['schedule'])
+        self.assertEqual(ExamSummary.objects.get(examID=exam).studentCount, 3)
+
+    def test_selection_exams_does_not_write(self):
+        ExamSummary.objects.all().delete()
+        response = APIClient().get('/api/exam/selection-exams', {'college': 'X'})
+        self.assertEqual(response.data[0]['num'], 3)
+        self.assertFalse(ExamSummary.objects.exists())
+
+
+class HallOccupancyTests(TestCase):
+    def setUp(self):
+        course = Course.objects.create(courseName='Maths', college='X')
+        self.exam = Exam.objects.create(name='Maths', college='X', courseID=course, date=date(2027, 1, 3), time=time(9))
+        self.halls = [Hall.objects.create(name=name, capacity=4) for name in 'AB']
+        self.students = [Student.objects.create(studentID=k, name=f'S{k}', email='') for k in range(1, 7)]
+        for k, student in enumerate(self.students):
+            Schedule.objects.create(examID=self.exam, studentID=student, hallID=self.halls[0] if k < 3 else None)
+        refresh_occupancy([self.exam.slot_id])
+
+    def seats(self):
+        return dict(HallOccupancy.objects.filter(slot=self.exam.slot_id).values_list('hallID', 'seats'))
+
+    def test_cascading_deletes_free_seats(self):
+        self.students[0].delete()
+        self.assertEqual(self.seats(), {self.halls[0].hallID: 2})
+        self.halls[0].delete()
+        self.assertEqual(self.seats(), {})
+
+    def test_deleting_the_course_frees_its_exam_seats(self):
+        response = APIClient().delete(f'/api/courses/{self.exam.courseID_id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Schedule.objects.exists())
+        self.assertEqual(self.seats(), {})
+        halls = APIClient().get(f'/api/exam/slots/{self.exam.slot_id}/halls').data
+        self.assertEqual([(hall['occupied'], hall['free']) for hall in halls], [(0, 4), (0, 4)])
+
+    def test_slot_assignment_reads_free_seats_from_the_table(self):
+        # Seats held by another exam's rows in the table count as taken
+        HallOccupancy.objects.filter(hallID=self.halls[1]).delete()
+        HallOccupancy.objects.create(hallID=self.halls[1], slot_id=self.exam.slot_id, seats=3)
+        response = APIClient().post(f'/api/exam/slots/{self.exam.slot_id}/assign-halls', {}, format='json')
+        self.assertEqual(response.data['assignments'][self.exam.examID], [
+            {'hallID': self.halls[0].hallID, 'students': 1}, {'hallID': self.halls[1].hallID, 'students': 1},
+        ])
+        self.assertEqual(response.data['unassigned'], {self.exam.examID: 1})
+
+
+class SelectionHallsTests(TestCase):
+    url = '/api/Instructor/selection-halls'
+
+    def setUp(self):
+        course = Course.objects.create(courseName='Maths', college='X')
+        exam = Exam.objects.create(name='Maths', college='X', courseID=course, date=date(2027, 1, 3), time=time(9))
+        for k, hall in enumerate(Hall.objects.create(name=name, capacity=4) for name in 'ABC'):
+            student = Student.objects.create(studentID=k + 1, name=f'S{k}', email='')
+            Schedule.objects.create(examID=exam, studentID=student, hallID=hall)
+
+    def test_limit_is_bounded(self):
+        for limit in ('0', '-3', '501', 'ten', ''):
+            response = APIClient().get(self.url, {'limit': limit})
+            self.assertEqual(response.status_code, 400, limit)
+
+    def test_cursor_walks_every_pair_once(self):
+        halls, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            page = APIClient().get(self.url, params).data
+            halls += [row['hall'] for row in page['results']]
+            cursor = page['nextCursor']
+            if cursor is None:
+                break
+        self.assertEqual(halls, ['A', 'B', 'C'])
+
+
+class ParseDayTests(SimpleTestCase):
+    def test_first_occurrence_on_or_after_the_reference(self):
+        self.assertEqual(parse_day('05Jan', date(2026, 12, 20)), date(2027, 1, 5))
+        self.assertEqual(parse_day('20Dec', date(2026, 12, 20)), date(2026, 12, 20))
+        # Nearest would be a week back, but the day has already passed
+        self.assertEqual(parse_day('13Jun', date(2026, 6, 20)), date(2027, 6, 13))
+
+    def test_leap_day_waits_for_a_leap_year(self):
+        self.assertEqual(parse_day('29Feb', date(2025, 3, 1)), date(2028, 2, 29))
+
+    def test_unparseable_text(self):
+        self.assertIsNone(parse_day('someday', date(2026, 1, 1)))
+
+
+class AvailabilityIndexTests(TestCase):
+    def setUp(self):
+        availability_index._index = None
+        self.instructor = Instructor.objects.create(name='Ada', email='ada@example.com')
+
+    def test_writes_rebuild_the_index(self):
+        index = availability_index.get_index()
+        day = AvailabilityDay.objects.create(date='01Jan', instructorID=self.instructor)
+        AvailabilityTime.objects.create(time='9:00AM', availabilityId=day)
+        # No commit needed: the stamp moved with the write itself
+        rebuilt = availability_index.get_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(
+            [row[0] for row in rebuilt.available_for(day.availableOn, time(9), None, [])], [self.instructor.instructorID]
+        )
+
+    def test_rolled_back_writes_leave_the_stamp_alone(self):
+        version = availability_index.current_version()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Instructor.objects.create(name='Bob', email='bob@example.com')
+            raise RuntimeError
+        self.assertEqual(availability_index.current_version(), version)
+
+
+class UploadFormatTests(SimpleTestCase):
+    def upload(self, content, name='roster', content_type='application/octet-stream'):
+        return SimpleUploadedFile(name, content, content_type=content_type)
+
+    def xlsx(self, rows):
+        workbook = openpyxl.Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        content = io.BytesIO()
+        workbook.save(content)
+        return content.getvalue()
+
+    def test_magic_bytes_win_over_name_and_type(self):
+        self.assertEqual(detect_format(self.upload(self.xlsx([['id']]), 'roster.csv', 'text/csv')), 'xlsx')
+        self.assertEqual(detect_format(self.upload(b'PAR1\x15\x00', 'roster.csv', 'text/csv')), 'parquet')
+
+    def test_delimited_text_by_type_then_name(self):
+        self.assertEqual(detect_format(self.upload(b'id\tname\n', 'roster', 'text/tab-separated-values')), 'tsv')
+        self.assertEqual(detect_format(self.upload(b'id\tname\n', 'roster.TSV')), 'tsv')
+        self.assertEqual(detect_format(self.upload(b'id,name\n', 'roster.txt', 'text/plain')), 'csv')
+
+    def test_detection_leaves_the_file_at_its_start(self):
+        upload = self.upload(b'id,name\n1,Ada\n', 'roster.csv')
+        detect_format(upload)
+        self.assertEqual(upload.tell(), 0)
+
+    def test_rows_of_each_format_skip_the_header(self):
+        expected = [('1', 'Ada'), ('2', 'Bob')]
+        csv_upload = self.upload(b'\xef\xbb\xbfid,name\n1,Ada\n2,Bob\n', 'roster.csv')
+        tsv_upload = self.upload(b'id\tname\r\n1\tAda\r\n2\tBob\r\n', 'roster.tsv')
+        self.assertEqual([tuple(row) for row in iter_rows(csv_upload)], expected)
+        self.assertEqual([tuple(row) for row in iter_rows(tsv_upload)], expected)
+        xlsx_upload = self.upload(self.xlsx([['id', 'name'], [1, 'Ada'], [2, 'Bob']]), 'roster.xlsx')
+        self.assertEqual(list(iter_rows(xlsx_upload)), [(1, 'Ada'), (2, 'Bob')])
+
+    def test_reading_leaves_the_upload_open(self):
+        upload = self.upload(b'id,name\n1,Ada\n', 'roster.csv')
+        list(iter_rows(upload))
+        self.assertFalse(upload.closed)
+        upload.seek(0)
+        self.assertEqual(upload.read(), b'id,name\n1,Ada\n')
+
+
+class UploadJobTests(TestCase):
+    def test_stale_running_job_can_be_resumed(self):
+        started = timezone.now() - timedelta(hours=1)
+        job = UploadJob.objects.create(
+            kind='students', file='upload_jobs/roster.csv', status='running', rowsProcessed=2000,
+            startedAt=started, heartbeatAt=started,
+        )
+        client = APIClient()
+        self.assertEqual(client.get(f'/api/upload/jobs/{job.jobID}').data['status'], 'failed')
+        response = client.post(f'/api/upload/jobs/{job.jobID}/resume')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'queued')
+        self.assertEqual(response.data['rowsProcessed'], 2000)
+
+    def test_queued_job_lost_in_a_restart_is_resubmitted(self):
+        job = UploadJob.objects.create(kind='students', file='upload_jobs/roster.csv')
+        UploadJob.objects.filter(jobID=job.jobID).update(createdAt=timezone.now() - timedelta(hours=1))
+        with self.captureOnCommitCallbacks() as submitted:
+            response = APIClient().post(f'/api/upload/jobs/{job.jobID}/resume')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(submitted), 1)
+
+    @mock.patch.object(jobs, 'connection')
+    @mock.patch.object(jobs, 'close_old_connections')
+    def test_a_job_that_cannot_start_fails(self, *patches):
+        job = UploadJob.objects.create(kind='halls', file='upload_jobs/halls.csv')
+        jobs._run_upload(job.jobID)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error, "'halls'")
+
+    def test_live_running_job_is_not_resumed(self):
+        now = timezone.now()
+        job = UploadJob.objects.create(
+            kind='students', file='upload_jobs/roster.csv', status='running', startedAt=now, heartbeatAt=now,
+        )
+        response = APIClient().post(f'/api/upload/jobs/{job.jobID}/resume')
+        self.assertEqual(response.status_code, 409)
+
+
+class UploadLedgerTests(TestCase):
+    def setUp(self):
+        self.courses = [Course.objects.create(courseName=f'C{k}', college='X') for k in range(2)]
+        Student.objects.create(studentID=1, name='Ada', email='')
+
+    def upload(self, content):
+        file = SimpleUploadedFile('enrollments.csv', content, content_type='text/csv')
+        return APIClient().post('/api/upload/enrollments', {'file': file}, format='multipart').data
+
+    def test_rows_rejected_for_unknown_ids_are_retried(self):
+        course = self.courses[0].courseID
+        content = f'student,course\n1,{course}\n3,{course}\n'.encode()
+        first = self.upload(content)
+        self.assertEqual((first['created'], first['unknown']), (1, 1))
+        Student.objects.create(studentID=3, name='Cy', email='')
+        # Same file again: not a duplicate, and only the rejected row is ingested
+        again = self.upload(content)
+        self.assertFalse(again['ledger']['duplicate'])
+        self.assertEqual((again['created'], again['unchanged'], again['unknown']), (1, 1, 0))
+        self.assertTrue(Enrollment.objects.filter(student_id=3, course_id=course).exists())
+        # Now clean, the file short-circuits on the next upload
+        self.assertTrue(self.upload(content)['ledger']['duplicate'])
+
+    def test_duplicate_and_unchanged_files_skip_ingestion(self):
+        content = f'student,course\n1,{self.courses[0].courseID}\n'.encode()
+        self.upload(content)
+        with CaptureQueriesContext(connection) as duplicate_queries:
+            duplicate = self.upload(content)
+        self.assertTrue(duplicate['ledger']['duplicate'])
+        self.assertEqual((duplicate['rows'], duplicate['unchanged'], duplicate['created']), (1, 1, 0))
+        # Another file, same rows under a different header: every row is reused
+        with CaptureQueriesContext(connection) as reused_queries:
+            reused = self.upload(content.replace(b'student,course', b'Student,Course'))
+        self.assertEqual(reused['ledger'], {**reused['ledger'], 'duplicate': False, 'reusedRows': 1})
+        for query in duplicate_queries.captured_queries + reused_queries.captured_queries:
+            self.assertNotRegex(query['sql'], r'"(students|courses|Enrollment|cache_versions)"')
+
+    def upload_students(self, content):
+        file = SimpleUploadedFile('students.csv', content, content_type='text/csv')
+        return APIClient().post('/api/upload/students', {'file': file}, format='multipart').data
+
+    def test_only_the_latest_import_is_a_duplicate(self):
+        first = b'studentID,name,email\n1,Ada,\n'
+        self.upload_students(first)
+        self.upload_students(b'studentID,name,email\n1,Ada Lovelace,\n')
+        # The first file again: it was overwritten since, so it is ingested
+        again = self.upload_students(first)
+        self.assertFalse(again['ledger']['duplicate'])
+        self.assertEqual(again['updated'], 1)
+        self.assertEqual(Student.objects.get(studentID=1).name, 'Ada')
+
+    @mock.patch.object(jobs, 'connection')
+    @mock.patch.object(jobs, 'close_old_connections')
+    def test_finished_job_becomes_the_latest_import(self, *patches):
+        first = b'studentID,name,email\n1,Ada,\n'
+        self.upload_students(first)
+        content = b'studentID,name,email\n1,Ada Lovelace,\n'
+        with TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            job = UploadJob.objects.create(kind='students', file=SimpleUploadedFile('roster.csv', content))
+            jobs._run_upload(job.jobID)
+        self.assertEqual(UploadJob.objects.get(jobID=job.jobID).status, 'done')
+        self.assertTrue(self.upload_students(content)['ledger']['duplicate'])
+        self.assertFalse(self.upload_students(first)['ledger']['duplicate'])
+        self.assertEqual(Student.objects.get(studentID=1).name, 'Ada')
+
+
+class IngestStudentsTests(TestCase):
+    def test_counts_across_batches(self):
+        Student.objects.create(studentID=1, name='Ada', email='ada@example.com')
+        Student.objects.create(studentID=2, name='Bob', email='')
+        rows = [
+            (1, 'Ada', 'ada@example.com'),
+            (2, 'Bob', 'bob@example.com'),
+            (3, 'Cy', ''),
+            # Same ID twice in one batch: the later row wins, the earlier is skipped
+            (5, 'Eve', ''),
+            (5, 'Eve Smith', 'eve@example.com'),
+            ('x', 'Dee', ''),
+            (4, '', ''),
+        ]
+        report = ingest_students(rows, batch_size=3)
+        self.assertEqual(report.rows, 7)
+        self.assertEqual(report.counts, {'created': 2, 'updated': 1, 'unchanged': 1, 'skipped': 3})
+        self.assertEqual(
+            list(Student.objects.order_by('studentID').values_list('studentID', 'name', 'email')),
+            [(1, 'Ada', 'ada@example.com'), (2, 'Bob', 'bob@example.com'), (3, 'Cy', ''),
+             (5, 'Eve Smith', 'eve@example.com')],
+        )
+
+    def test_checkpoint_runs_once_per_batch(self):
+        rows = [(k, f'S{k}', '') for k in range(1, 8)]
+        seen = []
+        ingest_students(rows, batch_size=3, checkpoint=lambda report: seen.append(report.rows))
+        self.assertEqual(seen, [3, 6, 7])
+
+
+class ExamListTests(TestCase):
+    def setUp(self):
+        self.exams = []
+        for k, hour in enumerate([9, 9, 11]):
+            course = Course.objects.create(courseName=f'C{k}', college='X')
+            self.exams.append(Exam.objects.create(
+                name=f'E{k}', college='X', courseID=course, date=date(2027, 1, 3), time=time(hour)
+            ))
+        students = [Student.objects.create(studentID=k, name=f'S{k}', email='') for k in range(1, 4)]
+        # Student 1 sits both 09:00 exams; the others sit one exam each
+        for student, k in [(students[0], 0), (students[0], 1), (students[1], 0), (students[2], 2)]:
+            Schedule.objects.create(examID=self.exams[k], studentID=student, college='X')
+
+    def conflicts(self):
+        response = APIClient().get('/api/exam/', {'college': 'X'})
+        return {row['examID']: row['conflict'] for row in response.data['selectionExams']}
+
+    def test_counts_students_with_two_exams_in_the_slot(self):
+        self.assertEqual(self.conflicts(), {self.exams[0].examID: 1, self.exams[1].examID: 1, self.exams[2].examID: 0})
+
+    def test_query_count_does_not_grow_with_exams(self):
+        with self.assertNumQueries(3):
+            self.conflicts()
+        for k in range(5):
+            course = Course.objects.create(courseName=f'More{k}', college='X')
+            Exam.objects.create(name=f'M{k}', college='X', courseID=course, date=date(2027, 1, 4 + k), time=time(9))
+        with self.assertNumQueries(3):
+            self.conflicts()
+
+
+class DryRunTests(TestCase):
+    def setUp(self):
+        self.exams = []
+        for k in range(3):
+            course = Course.objects.create(courseName=f'C{k}', college='X')
+            self.exams.append(Exam.objects.create(name=f'E{k}', college='X', courseID=course))
+        # Exams 0 and 1 share a student, so one sitting holds only one of them besides exam 2
+        for student_id, k in [(1, 0), (1, 1), (2, 2)]:
+            student, _ = Student.objects.get_or_create(studentID=student_id, defaults={'name': 'S', 'email': ''})
+            Enrollment.objects.create(student=student, course=self.exams[k].courseID)
+        ExamSlot.objects.create(date=date(2027, 1, 4), time=time(9), inCalendar=True)
+
+    def test_reports_metrics_and_writes_nothing(self):
+        response = APIClient().post('/api/exam/schedule-exams', {'dry_run': True}, format='json')
+        metrics = response.data['metrics']
+        self.assertEqual(metrics['examsPlaced'], 2)
+        self.assertEqual(len(metrics['unplacedExams']), 1)
+        self.assertIn(metrics['unplacedExams'][0], {self.exams[0].examID, self.exams[1].examID})
+        self.assertEqual(metrics['clashes'], 0)
+        self.assertEqual(metrics['maxExamsPerDay'], 1)
+        self.assertEqual(metrics['slotUtilisation']['used'], 1)
+        self.assertEqual(metrics['slotUtilisation']['total'], 1)
+        self.assertEqual(metrics['slotUtilisation']['slots'][0]['exams'], 2)
+        self.assertEqual(metrics['slotUtilisation']['slots'][0]['students'], 2)
+
+        self.assertFalse(Exam.objects.filter(Q(date__isnull=False) | Q(slot__isnull=False)).exists())
+        self.assertFalse(Schedule.objects.exists())
+        self.assertEqual(ExamSlot.objects.count(), 1)
+
+
+class ScheduleRepairViewTests(TestCase):
+    def setUp(self):
+        for day in (3, 4, 5):
+            ExamSlot.objects.create(date=date(2027, 1, day), time=time(13), inCalendar=True)
+        self.exams = []
+        for k, day in enumerate([3, 3, 4]):
+            course = Course.objects.create(courseName=f'C{k}', college='X')
+            self.exams.append(Exam.objects.create(
+                name=f'E{k}', college='X', courseID=course, date=date(2027, 1, day), time=time(13)
+            ))
+        students = [Student.objects.create(studentID=k, name=f'S{k}', email='') for k in range(1, 4)]
+        # Students 2 and 3 keep exams 0 and 1 off 01-04; student 1 enrols late in both, so they clash
+        for student, k in [(students[1], 1), (students[1], 2), (students[2], 0), (students[2], 2)]:
+            Schedule.objects.create(examID=self.exams[k], studentID=student, college='X')
+            Enrollment.objects.create(student=student, course=self.exams[k].courseID)
+        for k in (0, 1):
+            Enrollment.objects.create(student=students[0], course=self.exams[k].courseID)
+
+    def test_moves_only_into_calendar_slots(self):
+        response = APIClient().post('/api/exam/schedule-repair', {}, format='json')
+        self.assertEqual(len(response.data['moved']), 1)
+        (moved, sitting), = response.data['moved'].items()
+        self.assertIn(moved, {self.exams[0].examID, self.exams[1].examID})
+        # The only calendar day without a clash is 01-05, which has no exam yet
+        self.assertEqual(sitting, {'date': '2027-01-05', 'time': '13:00'})
+        self.assertFalse(ExamSlot.objects.filter(inCalendar=False).exists())
+        self.assertEqual(Exam.objects.get(examID=moved).slot.date, date(2027, 1, 5))
+
+    def test_off_calendar_exams_stay_put_and_take_no_company(self):
+        off = ExamSlot.objects.create(date=date(2027, 1, 5), time=time(9))
+        self.exams[2].date, self.exams[2].time = off.date, off.time
+        self.exams[2].save()
+        response = APIClient().post('/api/exam/schedule-repair', {}, format='json')
+        (moved, sitting), = response.data['moved'].items()
+        self.assertEqual(sitting, {'date': '2027-01-04', 'time': '13:00'})
+        self.assertEqual(list(Exam.objects.filter(slot=off)), [self.exams[2]])
@@ -3,54 +3,38 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import status
-import openpyxl
-from io import BytesIO
+from django.db import transaction
+from django.utils import timezone
 
-from .models import Student, Course, Enrollment, Instructor, Hall, Exam
+from .models import UploadJob
+from . import jobs
+from .ledger import import_upload
+
+
+def _force(request):
+    """``force`` bypasses the upload ledger and ingests every row"""
+    value = request.data.get('force') or request.GET.get('force', '')
+    return str(value).lower() in ('1', 'true', 'yes')
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
 @parser_classes([MultiPartParser, FormParser])
 def upload_students(request):
-    """Upload students from Excel file"""
+    """Upload students from an Excel, CSV, TSV or Parquet file"""
     try:
         file = request.FILES.get('file')
         if not file:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Read Excel file
-        wb = openpyxl.load_workbook(BytesIO(file.read()))
-        print(wb)
-        ws = wb.active
-        
-        created_count = 0
-        updated_count = 0
-        
-        # Skip header row
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if not row[0]:  # Skip empty rows
-                continue
-            
-            student_id = row[0]
-            name = row[1]
-            email = row[2]
-            
-            student, created = Student.objects.get_or_create(
-                studentID=student_id,
-                defaults={'name': name, 'email': email}
-            )
-            
-            if created:
-                created_count += 1
-            else:
-                student.name = name
-                student.email = email
-                student.save()
-                updated_count += 1
+        # Rows stream straight from the upload and are written in batches
+        report, ledger = import_upload('students', file, _force(request))
+        report = report.as_dict()
         
         return Response({
-            'message': f'Uploaded successfully. Created: {created_count}, Updated: {updated_count}'
+            'message': f"Uploaded successfully. Created: {report['created']}, Updated: {report['updated']}",
+            **report,
+            'ledger': ledger,
         })
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -60,32 +44,19 @@ def upload_students(request):
 @permission_classes([AllowAny])
 @parser_classes([MultiPartParser, FormParser])
 def upload_courses(request):
-    """Upload courses from Excel file"""
+    """Upload courses from an Excel, CSV, TSV or Parquet file"""
     try:
         file = request.FILES.get('file')
         if not file:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        wb = openpyxl.load_workbook(BytesIO(file.read()))
-        ws = wb.active
-        
-        created_count = 0
-        
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if not row[0]:
-                continue
-            
-            course_name = row[0]
-            college = row[1]
-            
-            Course.objects.get_or_create(
-                courseName=course_name,
-                college=college
-            )
-            created_count += 1
+        report, ledger = import_upload('courses', file, _force(request))
+        report = report.as_dict()
         
         return Response({
-            'message': f'Uploaded {created_count} courses successfully'
+            'message': f"Uploaded {report['created'] + report['unchanged']} courses successfully",
+            **report,
+            'ledger': ledger,
         })
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -95,39 +66,22 @@ def upload_courses(request):
 @permission_classes([AllowAny])
 @parser_classes([MultiPartParser, FormParser])
 def upload_enrollments(request):
-    """Upload student-course enrollments from Excel file"""
+    """Upload student-course enrollments from an Excel, CSV, TSV or Parquet file"""
     try:
         file = request.FILES.get('file')
         if not file:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        wb = openpyxl.load_workbook(BytesIO(file.read()))
-        ws = wb.active
-        
-        created_count = 0
-        
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if not row[0] or not row[1]:
-                continue
-            
-            student_id = row[0]
-            course_id = row[1]
-            
-            try:
-                student = Student.objects.get(studentID=student_id)
-                course = Course.objects.get(courseID=course_id)
-                
-                Enrollment.objects.get_or_create(
-                    student=student,
-                    course=course
-                )
-                created_count += 1
-            except (Student.DoesNotExist, Course.DoesNotExist):
-                continue
+        report, ledger = import_upload('enrollments', file, _force(request))
         
-        return Response({
-            'message': f'Uploaded {created_count} enrollments successfully'
-        })
+        response = {
+            'message': f"Uploaded {report.counts['created']} enrollments successfully",
+            **report.as_dict(),
+            'ledger': ledger,
+        }
+        if report.errors:
+            response['errors'] = report.error_lists()
+        return Response(response)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -136,32 +90,85 @@ def upload_enrollments(request):
 @permission_classes([AllowAny])
 @parser_classes([MultiPartParser, FormParser])
 def upload_halls(request):
-    """Upload halls from Excel file"""
+    """Upload halls from an Excel, CSV, TSV or Parquet file"""
     try:
         file = request.FILES.get('file')
         if not file:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        wb = openpyxl.load_workbook(BytesIO(file.read()))
-        ws = wb.active
-        
-        created_count = 0
-        
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if not row[0]:
-                continue
-            
-            name = row[0]
-            capacity = row[1]
-            
-            Hall.objects.get_or_create(
-                name=name,
-                defaults={'capacity': capacity}
-            )
-            created_count += 1
+        report, ledger = import_upload('halls', file, _force(request))
+        report = report.as_dict()
         
         return Response({
-            'message': f'Uploaded {created_count} halls successfully'
+            'message': f"Uploaded {report['created'] + report['unchanged']} halls successfully",
+            **report,
+            'ledger': ledger,
         })
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@parser_classes([MultiPartParser, FormParser])
+def upload_job_create(request):
+    """Store a students or enrollments file and ingest it in the background.
+
+    Jobs resume by row offset, so they skip the upload ledger and ingest
+    every row; once done the file is recorded as the endpoint's latest
+    import, without row hashes to diff against.
+    """
+    kind = request.data.get('kind')
+    file = request.FILES.get('file')
+    if kind not in jobs.UPLOAD_INGESTERS:
+        return Response({'error': f"kind must be one of: {', '.join(jobs.UPLOAD_INGESTERS)}"}, status=status.HTTP_400_BAD_REQUEST)
+    if not file:
+        return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    job = UploadJob.objects.create(kind=kind, file=file)
+    jobs.submit_upload(job)
+    
+    return Response(jobs.upload_job_status(job), status=status.HTTP_202_ACCEPTED)
+
+
+def _recover_jobs():
+    """Fail upload jobs whose worker died and resubmit queued ones nobody picked up"""
+    jobs.fail_stale(UploadJob)
+    jobs.requeue_stale(UploadJob, jobs.submit_upload)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def upload_job_detail(request, jobID):
+    """Poll an upload job"""
+    _recover_jobs()
+    try:
+        job = UploadJob.objects.get(jobID=jobID)
+    except UploadJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response(jobs.upload_job_status(job))
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def upload_job_resume(request, jobID):
+    """Restart a failed upload job after its last committed batch.
+
+    A running job whose worker stopped heartbeating counts as failed, and
+    a queued one lost in a restart is resubmitted.
+    """
+    _recover_jobs()
+    with transaction.atomic():
+        # Stamped so requeue_stale leaves it alone while it waits for a worker
+        updated = UploadJob.objects.filter(jobID=jobID, status='failed').update(
+            status='queued', heartbeatAt=timezone.now()
+        )
+        if not updated:
+            if not UploadJob.objects.filter(jobID=jobID).exists():
+                return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({'message': 'Only failed jobs can be resumed'}, status=status.HTTP_409_CONFLICT)
+        job = UploadJob.objects.get(jobID=jobID)
+        jobs.submit_upload(job)
+    
+    return Response(jobs.upload_job_status(job), status=status.HTTP_202_ACCEPTED)
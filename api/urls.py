@@ -32,6 +32,13 @@ urlpatterns = [
     path('exam/<int:id>', exam_views.exam_delete, name='exam-delete'),
     path('exam/select-hall/<int:examID>', exam_views.exam_select_hall, name='exam-select-hall'),
     path('exam/schedule-exams', exam_views.schedule_exams_auto, name='exam-schedule-auto'),
+    path('exam/schedule-repair', exam_views.schedule_repair, name='exam-schedule-repair'),
+    path('exam/schedule-jobs', exam_views.schedule_job_create, name='exam-schedule-job-create'),
+    path('exam/schedule-jobs/<int:jobID>', exam_views.schedule_job_detail, name='exam-schedule-job-detail'),
+    path('exam/schedule-jobs/<int:jobID>/cancel', exam_views.schedule_job_cancel, name='exam-schedule-job-cancel'),
+    path('exam/slots', exam_views.exam_slots, name='exam-slots'),
+    path('exam/slots/<int:slotID>/assign-halls', exam_views.slot_assign_halls, name='exam-slot-assign-halls'),
+    path('exam/slots/<int:slotID>/halls', exam_views.slot_free_halls, name='exam-slot-free-halls'),
     path('exam/exam-schedules', exam_views.exam_schedules, name='exam-schedules'),
     path('exam/exam-hall-invigilators', exam_views.exam_hall_invigilators, name='exam-hall-invigilators'),
     
@@ -44,6 +51,7 @@ urlpatterns = [
     path('Instructor/selection-halls', instructor_views.selection_halls, name='instructor-selection-halls'),
     path('Instructor/invigilator-exist/<int:examID>', instructor_views.invigilator_exist, name='instructor-invigilator-exist'),
     path('Instructor/select-instructor/<str:hall>/<int:examID>', instructor_views.select_instructor, name='instructor-select'),
+    path('Instructor/auto-assign', instructor_views.auto_assign_invigilators, name='instructor-auto-assign'),
     path('Instructor/instructors-for-exam-and-hall-delete', instructor_views.instructors_for_exam_and_hall_delete, name='instructor-delete-assignment'),
     path('Instructor/instructors-for-exam-and-hall/<int:examID>/<int:hallID>', instructor_views.instructors_for_exam_and_hall, name='instructor-exam-hall'),
     
@@ -52,6 +60,9 @@ urlpatterns = [
     path('upload/courses', upload_views.upload_courses, name='upload-courses'),
     path('upload/enrollments', upload_views.upload_enrollments, name='upload-enrollments'),
     path('upload/halls', upload_views.upload_halls, name='upload-halls'),
+    path('upload/jobs', upload_views.upload_job_create, name='upload-job-create'),
+    path('upload/jobs/<int:jobID>', upload_views.upload_job_detail, name='upload-job-detail'),
+    path('upload/jobs/<int:jobID>/resume', upload_views.upload_job_resume, name='upload-job-resume'),
     
     # Print routes
     path('print/exam-schedule', print_views.print_exam_schedule, name='print-exam-schedule'),
@@ -2,22 +2,27 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, action, permission_classes,authentication_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from django.db.models import Q, Count, F
+from django.db.models import Q, Count, F, Exists, OuterRef
 from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
+from collections import Counter
 from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
 import jwt
 from django.conf import settings
 
 from .models import (
     Adminn as Admin, Student, Course, Enrollment, CourseMappings, CourseMappingRelation,
-    Exam, Hall, Instructor, Schedule, AvailabilityDay, AvailabilityTime, InstructorOnHall
+    Exam, Hall, Instructor, Schedule, AvailabilityDay, AvailabilityTime, InstructorOnHall, ExamSummary
 )
 from .serializers import (
     AdminSerializer, StudentSerializer, CourseSerializer, ExamSerializer,
     HallSerializer, InstructorSerializer, ScheduleSerializer, CourseMappingsSerializer
 )
 from .authentication import CookieJWTAuthentication
+from .coenrolment import get_matrix
+from .summaries import build_summaries, refresh_summaries
 
 
 # Admin Views
@@ -163,6 +168,10 @@ def student_search(request, studentID):
 def students_in_courses(request, course1, course2):
     course_ids = [int(course1), int(course2)]
     
+    # Nothing to fetch when no student takes both courses
+    if not get_matrix().shared(*course_ids):
+        return Response([])
+    
     # Find students enrolled in both courses
     students = Student.objects.filter(
         courses__courseID__in=course_ids
@@ -217,17 +226,17 @@ def exam_list(request):
     college = request.GET.get('college')
     
     exams = Exam.objects.filter(date__isnull=True, college=college)
-    selection_exams = Exam.objects.filter(date__isnull=False, college=college)
+    selection_exams = list(Exam.objects.filter(date__isnull=False, college=college))
+    conflicts = slot_conflict_counts({exam.slot_id for exam in selection_exams})
     
     selection = []
     for exam in selection_exams:
-        conflict = conflict_student_count(exam.date, exam.time)
         selection.append({
             'examID': exam.examID,
             'name': exam.name,
             'date': exam.date,
             'time': exam.time,
-            'conflict': conflict
+            'conflict': conflicts.get(exam.slot_id, 0)
         })
     
     return Response({
@@ -236,18 +245,19 @@ def exam_list(request):
     })
 
 
-def conflict_student_count(date, time):
-    if not date:
-        return 0
+def slot_conflict_counts(slot_ids):
+    """Students sitting more than one exam, per slot, in one grouped query"""
+    slot_ids = [slot_id for slot_id in slot_ids if slot_id]
+    if not slot_ids:
+        return {}
     
-    conflicting_students = Schedule.objects.filter(
-        examID__date=date,
-        examID__time=time
-    ).values('studentID').annotate(
+    clashing = Schedule.objects.filter(
+        examID__slot__in=slot_ids
+    ).values('examID__slot', 'studentID').annotate(
         conflict_count=Count('scheduleID')
     ).filter(conflict_count__gt=1)
     
-    return conflicting_students.count()
+    return Counter(row['examID__slot'] for row in clashing)
 
 
 @api_view(['GET'])
@@ -262,41 +272,41 @@ def exam_halls(request, examID):
 @permission_classes([AllowAny])
 def selection_exams(request):
     college = request.GET.get('college')
-    selection_exams = Exam.objects.filter(date__isnull=False, college=college)
+    
+    summaries = list(ExamSummary.objects.filter(
+        examID__date__isnull=False, examID__college=college
+    ).select_related('examID'))
+    
+    # Summaries are kept by the write paths; exams that predate them are
+    # summarised in memory, since a read must not write
+    missing = {
+        exam.examID: exam
+        for exam in Exam.objects.filter(date__isnull=False, college=college, summary__isnull=True)
+    }
+    for summary in build_summaries(missing):
+        summary.examID = missing[summary.examID_id]
+        summaries.append(summary)
+    summaries.sort(key=lambda summary: summary.examID_id)
     
     selection = []
-    for exam in selection_exams:
-        count = Schedule.objects.filter(examID=exam).count()
-        halls = Hall.objects.filter(schedules__examID=exam).distinct()
-        
+    for summary in summaries:
+        exam = summary.examID
         hs = []
         instructors_list = []
-        
-        for hall in halls:
-            instructors = Instructor.objects.filter(
-                instructor_on_halls__examID=exam,
-                instructor_on_halls__hallID=hall
-            ).distinct()
-            
-            if instructors.exists():
-                instructor_names = ' / '.join([inst.name for inst in instructors])
-                instructors_list.append(f"{hall.name} ({instructor_names})")
+        for hall in summary.halls:
+            if hall['invigilators']:
+                instructors_list.append(f"{hall['name']} ({' / '.join(hall['invigilators'])})")
             else:
-                instructors_list.append(f"{hall.name} (بدون مراقب)")
-            
-            capacity_used = Schedule.objects.filter(hallID=hall, examID=exam).count()
-            space_left = hall.capacity - capacity_used
-            hs.append(f"{hall.name} {space_left}")
-        
-        without_halls = Schedule.objects.filter(examID=exam, hallID__isnull=True).count()
+                instructors_list.append(f"{hall['name']} (بدون مراقب)")
+            hs.append(f"{hall['name']} {hall['remaining']}")
         
         selection.append({
             'examID': exam.examID,
             'name': exam.name,
             'date': str(exam.date) if exam.date else None,
             'time': str(exam.time) if exam.time else None,
-            'num': count,
-            'withoutHalls': without_halls,
+            'num': summary.studentCount,
+            'withoutHalls': summary.withoutHalls,
             'hall': ' / '.join(hs),
             'invigilator': ' / '.join(instructors_list)
         })
@@ -307,45 +317,41 @@ def selection_exams(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def conflict_exams(request):
-    exams = Exam.objects.filter(date__isnull=False).prefetch_related('schedules')
-    
-    conflicts = {}
-    student_exam_times = {}
-    
-    for exam in exams:
-        exam_datetime = f"{exam.date} {exam.time}"
-        for schedule in exam.schedules.all():
-            student_id = schedule.studentID.studentID
-            if student_id not in student_exam_times:
-                student_exam_times[student_id] = {}
-            if exam_datetime not in student_exam_times[student_id]:
-                student_exam_times[student_id][exam_datetime] = []
-            student_exam_times[student_id][exam_datetime].append(exam.examID)
-    
-    for student_id, times in student_exam_times.items():
-        for exam_datetime, exam_ids in times.items():
-            if len(exam_ids) > 1:
-                for exam_id in exam_ids:
-                    if exam_id not in conflicts:
-                        exam = exams.get(examID=exam_id)
-                        conflicts[exam_id] = {
-                            'examID': exam.examID,
-                            'name': exam.name,
-                            'date': exam.date,
-                            'time': exam.time,
-                            'studentList': set()
-                        }
-                    conflicts[exam_id]['studentList'].add(student_id)
+    # A row clashes when the same student has another row in the same slot;
+    # the semi-join is served by the student index on the schedule
+    other_in_slot = Schedule.objects.filter(
+        studentID=OuterRef('studentID'),
+        examID__slot=OuterRef('examID__slot'),
+    ).exclude(scheduleID=OuterRef('scheduleID'))
+    
+    rows = Schedule.objects.filter(examID__slot__isnull=False).filter(Exists(other_in_slot))
+    college = request.GET.get('college')
+    if college:
+        rows = rows.filter(examID__college=college)
+    
+    if request.GET.get('page'):
+        page = int(request.GET.get('page', 1))
+        limit = int(request.GET.get('limit', 10))
+        offset = (page - 1) * limit
+        exam_ids = list(
+            rows.order_by('examID').values_list('examID', flat=True).distinct()[offset:offset + limit]
+        )
+        rows = rows.filter(examID__in=exam_ids)
+    
+    rows = rows.order_by('examID', 'studentID').values_list(
+        'examID', 'examID__name', 'examID__date', 'examID__time', 'studentID'
+    )
     
     result = []
-    for exam_id, data in conflicts.items():
+    for (exam_id, name, date, time), group in groupby(rows.iterator(chunk_size=5000), key=itemgetter(0, 1, 2, 3)):
+        students = [str(row[4]) for row in group]
         result.append({
-            'examID': data['examID'],
-            'name': data['name'],
-            'date': str(data['date']),
-            'time': str(data['time']),
-            'conflict count': len(data['studentList']),
-            'student': ' / '.join([str(s) for s in data['studentList']])
+            'examID': exam_id,
+            'name': name,
+            'date': str(date),
+            'time': str(time),
+            'conflict count': len(students),
+            'student': ' / '.join(students)
         })
     
     return Response(result)
@@ -426,7 +432,10 @@ def instructor_update(request, id):
         AvailabilityTime.objects.filter(availabilityId=day).delete()
     availability_days.delete()
     
-    InstructorOnHall.objects.filter(instructorID=instructor).delete()
+    duties = InstructorOnHall.objects.filter(instructorID=instructor)
+    exam_ids = list(duties.values_list('examID', flat=True).distinct())
+    duties.delete()
+    refresh_summaries(exam_ids)
     
     # Create new availability
     for day_data in days:
@@ -452,7 +461,10 @@ def instructor_delete(request, id):
     try:
         instructor = Instructor.objects.get(instructorID=id)
         
-        InstructorOnHall.objects.filter(instructorID=instructor).delete()
+        duties = InstructorOnHall.objects.filter(instructorID=instructor)
+        exam_ids = list(duties.values_list('examID', flat=True).distinct())
+        duties.delete()
+        refresh_summaries(exam_ids)
         
         availability_days = AvailabilityDay.objects.filter(instructorID=instructor)
         for day in availability_days:
@@ -125,6 +125,13 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'uploads'
+
+# Worker threads for background scheduling jobs
+SCHEDULE_JOB_WORKERS = 1
+# Worker threads for background upload jobs, separate from the scheduling ones
+UPLOAD_JOB_WORKERS = 1
+# A running job that has not reported progress for this long is failed
+JOB_LEASE_SECONDS = 300
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 